@@ -1,11 +1,12 @@
 import abc
-from typing import Iterable, Iterator, NamedTuple
+from typing import Iterable, Iterator, NamedTuple, Optional
 import networkx as nx
 
 
 class Content(NamedTuple):
     text: str
     url: str
+    timestamp: Optional[float] = None  # seconds since epoch
 
 
 class ContentRetriever(abc.ABC):
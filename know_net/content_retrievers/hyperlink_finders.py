@@ -1,39 +1,218 @@
 import abc
-from typing import Iterator, Optional
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 from urllib import parse
 
 import bs4
+import numpy as np
+from langchain.embeddings import base as embeddings_base
+
+from know_net import entity_typing
 
 DEFAULT_MAX_LINKS = None  # if None, then no cap
+DEFAULT_TOPIC_WEIGHT = 1.0
+DEFAULT_TOPIC_CACHE_SIZE = 10_000
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside"]
+
+# weights of the heuristic link score
+SLUG_WORDS_WEIGHT = 1.0  # article urls end in a slug like /apple-unveils-iphone-15
+SAME_SITE_WEIGHT = 0.5
+TEXT_LENGTH_WEIGHT = 0.5
+BOILERPLATE_PENALTY = 1.0
+MAX_SLUG_WORDS = 10
+
+_SLUG_SPLIT_RE = re.compile(r"[-_+.]")
+
+
+class LinkFeatures(NamedTuple):
+    """Features of the anchors of a page, one row per anchor"""
+
+    urls: List[str]
+    texts: List[str]
+    n_words: np.ndarray
+    capitalized_ratio: np.ndarray  # of the words starting with a capital
+    slug_words: np.ndarray  # alphabetic words in the last path segment
+    same_site: np.ndarray
+    in_boilerplate: np.ndarray  # inside nav, header, footer or aside
 
+    def __len__(self) -> int:
+        return len(self.urls)
 
-class HyperLinkFinder(abc.ABC):
+    def take(self, rows: np.ndarray) -> "LinkFeatures":
+        return LinkFeatures(
+            urls=[self.urls[i] for i in rows],
+            texts=[self.texts[i] for i in rows],
+            n_words=self.n_words[rows],
+            capitalized_ratio=self.capitalized_ratio[rows],
+            slug_words=self.slug_words[rows],
+            same_site=self.same_site[rows],
+            in_boilerplate=self.in_boilerplate[rows],
+        )
+
+
+def extract_link_features(html: str, base_url: str) -> LinkFeatures:
+    """Features of every http(s) anchor in `html`, in a single pass"""
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    base_host = parse.urlparse(base_url).netloc
+    urls: List[str] = []
+    texts: List[str] = []
+    rows: List[Tuple[int, float, int, bool, bool]] = []
+    for tag in soup.find_all("a", href=True):
+        try:
+            url, _ = parse.urldefrag(parse.urljoin(base_url, tag["href"]))
+            parsed = parse.urlparse(url)
+        except ValueError:  # malformed href, e.g. "http://[x"
+            continue
+        if parsed.scheme not in ("http", "https"):
+            continue
+        words = tag.text.split()
+        capitalized = sum(word[0].isupper() for word in words)
+        segments = [s for s in parsed.path.split("/") if s]
+        slug = segments[-1].rsplit(".", 1)[0] if segments else ""
+        rows.append(
+            (
+                len(words),
+                capitalized / len(words) if words else 0.0,
+                sum(w.isalpha() for w in _SLUG_SPLIT_RE.split(slug)),
+                parsed.netloc == base_host,
+                tag.find_parent(BOILERPLATE_TAGS) is not None,
+            )
+        )
+        urls.append(url)
+        texts.append(" ".join(words))
+    n_words, capitalized_ratio, slug_words, same_site, in_boilerplate = (
+        zip(*rows) if rows else ((),) * 5
+    )
+    return LinkFeatures(
+        urls=urls,
+        texts=texts,
+        n_words=np.array(n_words, dtype=np.int32),
+        capitalized_ratio=np.array(capitalized_ratio, dtype=np.float32),
+        slug_words=np.array(slug_words, dtype=np.int32),
+        same_site=np.array(same_site, dtype=bool),
+        in_boilerplate=np.array(in_boilerplate, dtype=bool),
+    )
+
+
+class LinkScorer(abc.ABC):
     """
-    Responsible for finding hyperlinks worth clicking in a html
+    Scores all links of a page at once. Higher is better, -inf rejects a link.
     """
 
-    def __init__(self, max_links: Optional[int] = None) -> None:
+    @abc.abstractmethod
+    def __call__(self, features: LinkFeatures) -> np.ndarray:
+        ...
+
+
+class HeuristicScorer(LinkScorer):
+    """
+    Rejects links whose text is too short, too long or all capitalized (menus,
+    section names), and prefers same-site article slugs with headline-like
+    texts outside of the page boilerplate.
+    """
+
+    def __init__(self, min_words: int, max_words: int) -> None:
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def __call__(self, features: LinkFeatures) -> np.ndarray:
+        scores = (
+            SLUG_WORDS_WEIGHT
+            * np.minimum(features.slug_words, MAX_SLUG_WORDS)
+            / MAX_SLUG_WORDS
+            + SAME_SITE_WEIGHT * features.same_site
+            + TEXT_LENGTH_WEIGHT * features.n_words / max(self.max_words, 1)
+            - BOILERPLATE_PENALTY * features.in_boilerplate
+        )
+        rejected = (
+            (features.n_words < self.min_words)
+            | (features.n_words > self.max_words)
+            | (features.capitalized_ratio == 1.0)
+        )
+        return np.where(rejected, -np.inf, scores)
+
+
+class TopicScorer(LinkScorer):
+    """
+    Cosine similarity between the link text and the closest topic of
+    interest. Link text embeddings are cached, as front pages are re-crawled
+    with mostly the same links.
+    """
+
+    def __init__(
+        self,
+        embeddings: embeddings_base.Embeddings,
+        topics: Sequence[str],
+        max_cache_size: Optional[int] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.topics = list(topics)
+        self.topic_vectors = entity_typing.normalize(
+            embeddings.embed_documents(self.topics)
+        )
+        self.max_cache_size = max_cache_size or DEFAULT_TOPIC_CACHE_SIZE
+        self.cache: Dict[str, np.ndarray] = {}
+
+    def __call__(self, features: LinkFeatures) -> np.ndarray:
+        if not len(features):
+            return np.zeros(0, dtype=np.float32)
+        missing = list(dict.fromkeys(t for t in features.texts if t not in self.cache))
+        if missing:
+            vectors = entity_typing.normalize(self.embeddings.embed_documents(missing))
+            self.cache.update(zip(missing, vectors))
+        text_vectors = np.stack([self.cache[t] for t in features.texts])
+        for _ in range(len(self.cache) - self.max_cache_size):
+            del self.cache[next(iter(self.cache))]  # oldest first
+        return (text_vectors @ self.topic_vectors.T).max(axis=1)
+
+
+class HyperLinkFinder:
+    """
+    Responsible for finding hyperlinks worth clicking in a html: scores all
+    links of the page with a weighted sum of scorers and returns the
+    `max_links` best ones.
+    """
+
+    def __init__(
+        self,
+        scorers: Sequence[Tuple[LinkScorer, float]],
+        max_links: Optional[int] = None,
+    ) -> None:
+        self.scorers = list(scorers)
         self.max_links = max_links if max_links is not None else DEFAULT_MAX_LINKS
 
     def get_links_from_html(self, html: str, base_url: str) -> Iterator[str]:
-        soup = bs4.BeautifulSoup(html, "html.parser")
-        links = soup.find_all("a", href=True)
-        for i, tag in enumerate(filter(self, links)):
-            if self.max_links and i > self.max_links:
+        features = extract_link_features(html, base_url)
+        scores = self.score(features)
+        seen = set()
+        for row in np.argsort(-scores, kind="stable"):
+            if scores[row] == -np.inf:
+                break
+            if self.max_links and len(seen) >= self.max_links:
                 break
-            link: str = tag["href"]
-            if not link.startswith("http"):
-                link = parse.urljoin(base_url, link)
-            yield link
+            url = features.urls[row]
+            if url not in seen:
+                seen.add(url)
+                yield url
 
-    @abc.abstractmethod
-    def __call__(self, tag: bs4.Tag) -> bool:
-        ...
+    def score(self, features: LinkFeatures) -> np.ndarray:
+        """
+        Scorers run in order on the links not yet rejected, so put cheap
+        filters before embedding based ones.
+        """
+        scores = np.zeros(len(features), dtype=np.float32)
+        for scorer, weight in self.scorers:
+            alive = np.flatnonzero(scores > -np.inf)
+            if not len(alive):
+                break
+            scores[alive] += weight * scorer(features.take(alive))
+        return scores
 
 
 class SimpleHeuristicFilter(HyperLinkFinder):
     """
-    TODO write `intelligent` class that uses a language model to filter out
+    Heuristic link scores, optionally plus the similarity of the link text to
+    topics of interest.
     """
 
     def __init__(
@@ -41,17 +220,14 @@ class SimpleHeuristicFilter(HyperLinkFinder):
         min_words: int,
         max_words: int,
         max_links: Optional[int] = None,
+        topic_scorer: Optional[TopicScorer] = None,
+        topic_weight: float = DEFAULT_TOPIC_WEIGHT,
     ) -> None:
         self.min_words = min_words
         self.max_words = max_words
-        super().__init__(max_links)
-
-    def __call__(self, tag: bs4.Tag) -> bool:
-        words = tag.text.split()
-        if len(words) < self.min_words:
-            return False
-        if len(words) > 20:
-            return False
-        if all(word[0].isupper() for word in words):
-            return False
-        return True
+        scorers: List[Tuple[LinkScorer, float]] = [
+            (HeuristicScorer(min_words, max_words), 1.0)
+        ]
+        if topic_scorer is not None:
+            scorers.append((topic_scorer, topic_weight))
+        super().__init__(scorers, max_links)
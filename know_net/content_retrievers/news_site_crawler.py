@@ -1,11 +1,12 @@
 import asyncio
+import time
 import loguru
 from typing import AsyncGenerator, Iterator, List, Optional, Set
 
 import aiohttp
 from typing_extensions import Annotated
 
-from know_net import base
+from know_net import base, metrics
 from know_net.content_retrievers import content_parsers, hyperlink_finders
 
 DEFAULT_CONTENT_FILTER = hyperlink_finders.SimpleHeuristicFilter(3, 30)
@@ -72,29 +73,37 @@ class NewsCrawler(base.ContentRetriever):
     ) -> AsyncGenerator[Optional[base.Content], None]:
         async with self._semaphore:
             async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
-                    text = await response.text()
+                with metrics.span("crawler_fetch"):
+                    async with session.get(url) as response:
+                        response.raise_for_status()
+                        text = await response.text()
 
-                    links = self.hyperlink_finder.get_links_from_html(text, url)
-                    tasks = [self._load_article(link) for link in links]
+                links = self.hyperlink_finder.get_links_from_html(text, url)
+                tasks = [self._load_article(link) for link in links]
 
-                    for result in asyncio.as_completed(tasks):
-                        yield await result
+                for result in asyncio.as_completed(tasks):
+                    yield await result
 
     async def _load_article(self, url: str) -> Optional[base.Content]:
         async with self._semaphore:
             for attempt in range(1, self.max_retries + 1):
                 async with aiohttp.ClientSession() as session:
                     try:
-                        async with session.get(url) as response:
-                            response.raise_for_status()
-                            text = await response.text()
+                        with metrics.span("crawler_fetch"):
+                            async with session.get(url) as response:
+                                response.raise_for_status()
+                                text = await response.text()
+                        with metrics.span("crawler_parse"):
                             parsed_text = self.content_parser.parse(text)
-                            logger.debug(f"Retrieved {url}")
-                            return base.Content(text=parsed_text, url=url)
+                        metrics.inc("crawler_articles_total")
+                        logger.debug(f"Retrieved {url}")
+                        return base.Content(
+                            text=parsed_text, url=url, timestamp=time.time()
+                        )
                     except aiohttp.ClientResponseError:
+                        metrics.inc("crawler_fetch_errors_total")
                         logger.debug(f"Request to {url} failed on attempt {attempt}")
                         await asyncio.sleep(2**attempt)  # exponential backoff
+            metrics.inc("crawler_failed_articles_total")
             logger.warning(f"All attempts to retrieve the URL failed: {url}")
             return None  # or some appropriate default value
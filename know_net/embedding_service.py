@@ -0,0 +1,144 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent import futures
+from typing import Any, List, NamedTuple, Optional
+
+import torch
+from langchain.embeddings import base as embeddings_base
+from langchain.embeddings import huggingface as huggingface_embeddings
+from loguru import logger
+
+from know_net import metrics
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_SECONDS = 0.005
+DEFAULT_ENCODE_BATCH_SIZE = 64
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _Request(NamedTuple):
+    texts: List[str]
+    future: "futures.Future[List[List[float]]]"
+
+
+class BatchingEmbeddings(embeddings_base.Embeddings):
+    """
+    Coalesces concurrent embed calls (from threads or asyncio tasks) into
+    micro-batches of up to `max_batch_size` texts, waiting at most
+    `max_wait` seconds for a batch to fill. Batches run on a worker thread,
+    so awaiting `aembed_*` does not block the event loop.
+    """
+
+    def __init__(
+        self,
+        embeddings: embeddings_base.Embeddings,
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size or DEFAULT_MAX_BATCH_SIZE
+        self.max_wait = max_wait if max_wait is not None else DEFAULT_MAX_WAIT_SECONDS
+        self._start()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def submit(self, texts: List[str]) -> "futures.Future[List[List[float]]]":
+        future: "futures.Future[List[List[float]]]" = futures.Future()
+        if not texts:
+            future.set_result([])
+        else:
+            self._queue.put(_Request(list(texts), future))
+        return future
+
+    def _start(self) -> None:
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._embed_batch(batch)
+
+    def _embed_batch(self, batch: List[_Request]) -> None:
+        texts = [t for request in batch for t in request.texts]
+        try:
+            with metrics.span("embed_batch"):
+                vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        metrics.inc("embeddings_total", len(texts))
+        metrics.observe("embed_batch_size", len(texts), BATCH_SIZE_BUCKETS)
+        start = 0
+        for request in batch:
+            end = start + len(request.texts)
+            request.future.set_result(vectors[start:end])
+            start = end
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_queue"], state["_worker"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._start()
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamic int8 quantization of the linear layers, for CPU inference"""
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def get_huggingface_embedder(
+    device: Optional[str] = None,
+    quantize: bool = False,
+    batch_size: Optional[int] = None,
+    **kwargs: Any,
+) -> huggingface_embeddings.HuggingFaceEmbeddings:
+    """
+    HuggingFaceEmbeddings on the best available device. With `quantize` the
+    model's linear layers are dynamically quantized to int8, which speeds up
+    CPU inference at a small cost in accuracy.
+    """
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    embedder = huggingface_embeddings.HuggingFaceEmbeddings(
+        model_kwargs={"device": device},
+        encode_kwargs={"batch_size": batch_size or DEFAULT_ENCODE_BATCH_SIZE},
+        **kwargs,
+    )
+    if quantize:
+        if device != "cpu":
+            logger.warning("int8 quantization is CPU only, ignoring on {}", device)
+        else:
+            embedder.client = quantize_int8(embedder.client)
+    logger.info("Initialized {} on {}", embedder.model_name, device)
+    return embedder
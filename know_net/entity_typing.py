@@ -0,0 +1,56 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings import base as embeddings_base
+from loguru import logger
+
+from know_net import ontology
+
+DEFAULT_MIN_TYPE_SIMILARITY = 0.3
+DEFAULT_TYPING_BATCH_SIZE = 64
+
+
+class EntityTyper:
+    """
+    Assigns ontology classes to entity names by cosine similarity between the
+    entity name and the class labels. Results are cached per entity name.
+    """
+
+    def __init__(
+        self,
+        embeddings: embeddings_base.Embeddings,
+        classes: Optional[List[ontology.OntologyClass]] = None,
+        min_similarity: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.classes = classes or ontology.load_ontology_classes()
+        self.min_similarity = min_similarity or DEFAULT_MIN_TYPE_SIMILARITY
+        self.batch_size = batch_size or DEFAULT_TYPING_BATCH_SIZE
+        labels = [c.label for c in self.classes]
+        self.class_vectors = normalize(embeddings.embed_documents(labels))
+        self.cache: Dict[str, Optional[str]] = {}
+        logger.info("Initialized EntityTyper with {} classes", len(self.classes))
+
+    def classify(self, names: Sequence[str]) -> List[Optional[str]]:
+        """
+        Returns the best matching class name per entity name, or None if no
+        class label is similar enough.
+        """
+        missing = list(dict.fromkeys(n for n in names if n not in self.cache))
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            vectors = normalize(self.embeddings.embed_documents(batch))
+            scores = vectors @ self.class_vectors.T
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(batch)), best]
+            for name, j, score in zip(batch, best, best_scores):
+                matched = score >= self.min_similarity
+                self.cache[name] = self.classes[j].name if matched else None
+        return [self.cache[n] for n in names]
+
+
+def normalize(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.maximum(norms, np.finfo(np.float32).eps)
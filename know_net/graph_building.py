@@ -1,25 +1,51 @@
 import asyncio
+import collections
+import functools
 import itertools
-from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, cast
+import os
+import time
+from concurrent import futures
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
 import diskcache
+import numpy as np
 from langchain import FAISS
 import networkx as nx
+from langchain.callbacks import get_openai_callback
 from langchain.docstore.document import Document
+from langchain.docstore.in_memory import InMemoryDocstore
 from langchain.embeddings import base as embeddings_base
-from langchain.embeddings import (
-    openai as openai_embeddings,
-    huggingface as huggingface_embeddings,
-)
+from langchain.embeddings import openai as openai_embeddings
 from langchain.graphs.networkx_graph import NetworkxEntityGraph
 from langchain.indexes import GraphIndexCreator
 from langchain.llms import base as llm_base
 from langchain.llms import huggingface_text_gen_inference, openai
 from langchain.vectorstores import Chroma
+from langchain.vectorstores.utils import DistanceStrategy
 from loguru import logger
 from openai import InvalidRequestError
 from pydantic import BaseModel
-from know_net import base
+from know_net import (
+    base,
+    embedding_service,
+    entity_typing,
+    lexical_index,
+    metrics,
+    ontology,
+    vector_index,
+)
 
 from know_net.base import GraphBuilder
 
@@ -28,13 +54,20 @@ logger = logger.opt(ansi=True)
 MAX_LLM_CONCURRENCY = 100
 MAX_EMBEDDER_CONCURRENCY = 100
 DEFAULT_MATCH_THRESHOLD = 0.95
+DEFAULT_SEARCH_K = 4
 TRIPLES_CACHE_PATH = ".triples_cache/%s"
 CHROMA_PERSISTENT_DISK_DIR = ".chroma_cache/%s"
 
 DEFAULT_LLM = openai.OpenAIChat()  # type: ignore
-DEFAULT_EMBEDDER = huggingface_embeddings.HuggingFaceEmbeddings()  # type: ignore
+DEFAULT_EMBEDDER = embedding_service.get_huggingface_embedder()
+
+DEFAULT_N_WORKERS = os.cpu_count() or 1
+DEFAULT_TIME_BUCKET_SECONDS = 60 * 60
 
 SOURCE_ATTR = "sources"
+SUPPORT_ATTR = "support"
+TYPE_ATTR = "type"
+MAX_SOURCES = 20  # per node or edge, the most recent ones are kept
 
 
 class Entity(BaseModel):
@@ -50,6 +83,7 @@ class KGTriple(NamedTuple):
     predicate: str
     object_: Entity
     url: str
+    timestamp: float = 0.0  # crawl or publish time, seconds since epoch
 
 
 RootEntity = Entity(name="root", is_a=None)
@@ -58,27 +92,55 @@ RootEntity = Entity(name="root", is_a=None)
 class ContentGraph(NamedTuple):
     url: str
     graph: NetworkxEntityGraph
+    timestamp: float = 0.0
+
+
+class BuilderShard(NamedTuple):
+    """Picklable summary of a partial builder, see LLMGraphBuilder.merge_shard"""
+
+    entity_names: List[str]
+    entity_types: List[Optional[str]]
+    vectors: np.ndarray  # one row per entity name
+    triples: List[Tuple[str, str, str, str, float]]  # s, p, o, url, timestamp
+    metrics: Optional[Dict] = None  # metrics.Registry.to_dict() of the worker
 
 
 class LLMGraphBuilder(GraphBuilder):
     _llm_semaphore = asyncio.Semaphore(MAX_LLM_CONCURRENCY)
-    _embedder_semaphore = asyncio.Semaphore(MAX_EMBEDDER_CONCURRENCY)
 
     def __init__(
         self,
         llm: Optional[llm_base.BaseLLM] = None,
         embedding_model: Optional[embeddings_base.Embeddings] = None,
         match_treshold: Optional[float] = None,
+        entity_typer: Optional[entity_typing.EntityTyper] = None,
+        index_config: Optional[vector_index.IndexConfig] = None,
+        max_age: Optional[float] = None,
+        time_bucket_seconds: Optional[float] = None,
+        batch_embeddings: bool = True,
     ) -> None:
         super().__init__()
         self.llm = llm or DEFAULT_LLM
         self.embeddings = embedding_model or DEFAULT_EMBEDDER
+        if batch_embeddings and not isinstance(
+            self.embeddings, embedding_service.BatchingEmbeddings
+        ):
+            # coalesces concurrent lookups, see graphqa.get_entities_knowledge
+            self.embeddings = embedding_service.BatchingEmbeddings(self.embeddings)
         self.match_threshold = match_treshold or DEFAULT_MATCH_THRESHOLD
         self.index_creator = GraphIndexCreator(llm=self.llm)
-        self.vectorstore = get_faiss_vectorstore(self.embeddings)
+        self.index_config = index_config or vector_index.IndexConfig()
+        self.vectorstore = get_faiss_vectorstore(self.embeddings, self.index_config)
         self.llm_cache = get_cache_triples_cache(self.llm)
         self.doc_to_entity: Dict[str, Entity] = {}
-        self.triples: List[KGTriple] = []
+        self.lexical_index = lexical_index.LexicalIndex()
+        self.entity_index_ids: Dict[str, int] = {}  # name -> vector index id
+        self.max_age = max_age  # if None, then triples never expire
+        self.time_bucket_seconds = time_bucket_seconds or DEFAULT_TIME_BUCKET_SECONDS
+        self.triple_buckets: Dict[int, List[KGTriple]] = {}
+        self.entity_typer = entity_typer or entity_typing.EntityTyper(self.embeddings)
+        self.class_entities = get_class_entities(self.entity_typer.classes)
+        self.type_index: Dict[str, Set[Entity]] = collections.defaultdict(set)
 
         logger.info("Initialized LLMGraphBuilder")
 
@@ -89,20 +151,58 @@ class LLMGraphBuilder(GraphBuilder):
             ContentGraph(
                 url=c.url,
                 graph=cast(NetworkxEntityGraph, self.llm_cache[c.text]),
+                timestamp=get_timestamp(c),
             )
             for c in contents
         ]
         normalized_graph_triples = map(self.normalize_graph_triples, graphs)
-        self.triples.extend(itertools.chain.from_iterable(normalized_graph_triples))
+        triples = list(itertools.chain.from_iterable(normalized_graph_triples))
+        self.assign_types(triples)
+        self.add_triples(triples)
+
+    def add_content_parallel(
+        self,
+        contents: Iterable[base.Content],
+        n_workers: Optional[int] = None,
+        builder_factory: Optional[Callable[[], "LLMGraphBuilder"]] = None,
+    ) -> None:
+        """
+        Splits the contents over worker processes that each build a partial
+        graph, then merges the partial graphs into this builder. By default
+        workers use copies of this builder's llm and embedding model, so both
+        must be picklable; otherwise pass a picklable `builder_factory`.
+        Worker metrics are merged into metrics.REGISTRY, worker profiles are
+        not collected.
+        """
+        contents = list(contents)
+        n_workers = n_workers or DEFAULT_N_WORKERS
+        builder_factory = builder_factory or functools.partial(
+            type(self),
+            llm=self.llm,
+            embedding_model=self.embeddings,
+            match_treshold=self.match_threshold,
+            index_config=self.index_config,
+        )
+        partitions = [contents[i::n_workers] for i in range(n_workers)]
+        with futures.ProcessPoolExecutor(n_workers) as pool:
+            shards = pool.map(
+                build_shard, partitions, itertools.repeat(builder_factory)
+            )
+            for shard in shards:
+                self.merge_shard(shard)
 
     def add_content(self, content: base.Content) -> None:
         if self.is_in_llm_cache(content.text):
-            content_graph = cast(ContentGraph, self.llm_cache[content])
+            graph = cast(NetworkxEntityGraph, self.llm_cache[content.text])
         else:
-            url = content.url
             graph = self.index_creator.from_text(content.text)
-            self.llm_cache[content] = content_graph = ContentGraph(url=url, graph=graph)
-        self.triples.extend(self.normalize_graph_triples(content_graph))
+            self.llm_cache[content.text] = graph
+        content_graph = ContentGraph(
+            url=content.url, graph=graph, timestamp=get_timestamp(content)
+        )
+        triples = self.normalize_graph_triples(content_graph)
+        self.assign_types(triples)
+        self.add_triples(triples)
 
     ## Updating LLM cache
     async def update_llm_cache_async(self, contents: Iterable[str]) -> None:
@@ -112,93 +212,469 @@ class LLMGraphBuilder(GraphBuilder):
 
     async def add_to_item_cache_async(self, text: str) -> None:
         async with self._llm_semaphore:
-            try:
-                entity_graph = await self.index_creator.afrom_text(text)
-            except InvalidRequestError as e:  # TODO pretty hacky
-                logger.exception(e)
-                entity_graph = await self.index_creator.afrom_text(text[:12000])
+            with metrics.span("llm_extract"), get_openai_callback() as cb:
+                try:
+                    entity_graph = await self.index_creator.afrom_text(text)
+                except InvalidRequestError as e:  # TODO pretty hacky
+                    logger.exception(e)
+                    metrics.inc("llm_errors_total")
+                    entity_graph = await self.index_creator.afrom_text(text[:12000])
+            metrics.inc("llm_requests_total", cb.successful_requests)
+            metrics.inc("llm_prompt_tokens_total", cb.prompt_tokens)
+            metrics.inc("llm_completion_tokens_total", cb.completion_tokens)
 
             self.llm_cache[text] = entity_graph
 
     ## Normalizing triples
     def normalize_graph_triples(self, graph: ContentGraph) -> List[KGTriple]:
         normalized_triplets: List[KGTriple] = list()
-        for subject, object_, predicate in graph.graph.get_triples():
-            triplet = self._normalize_triple(subject, object_, predicate, graph.url)
-            normalized_triplets.append(triplet)
+        triples = list(graph.graph.get_triples())
+        if not triples:
+            return normalized_triplets
+        names = list(dict.fromkeys(n for s, o, _ in triples for n in (s, o)))
+        # known names resolve lexically, embed the others in one batched call
+        names = [n for n in names if self.lexical_index.exact(n) is None]
+        with metrics.span("embed"):
+            vectors = dict(zip(names, self.embeddings.embed_documents(names)))
+        with metrics.span("normalize_triples"):
+            for subject, object_, predicate in triples:
+                triplet = self._normalize_triple(
+                    subject, object_, predicate, graph.url, graph.timestamp, vectors
+                )
+                normalized_triplets.append(triplet)
+        metrics.inc("triples_total", len(normalized_triplets))
         return normalized_triplets
 
     def _normalize_triple(
-        self, subject: str, object_: str, predicate: str, url: str
+        self,
+        subject: str,
+        object_: str,
+        predicate: str,
+        url: str,
+        timestamp: float = 0.0,
+        vectors: Optional[Dict[str, List[float]]] = None,
     ) -> KGTriple:
-        s = self.vectorstore.similarity_search_with_relevance_scores(subject, k=1)
-        o = self.vectorstore.similarity_search_with_relevance_scores(object_, k=1)
-        if len(s) and s[0][1] > self.match_threshold:
-            logger.debug("match for subject: {}", subject)
+        vectors = vectors or {}
+        s_entity = self._resolve_entity(subject, vectors.get(subject))
+        o_entity = self._resolve_entity(object_, vectors.get(object_))
+        return KGTriple(s_entity, predicate, o_entity, url, timestamp)
+
+    def _resolve_entity(self, name: str, vector: Optional[List[float]]) -> Entity:
+        # only exact keys skip the threshold, near names ("C++" for "C") must
+        # match by vector
+        exact = self.lexical_index.exact(name)
+        if exact is not None:
+            metrics.inc("entity_exact_matches_total")
+            return self.doc_to_entity[exact]
+        if vector is None:
+            vector = self.embeddings.embed_query(name)
+        with metrics.span("vector_search"):
+            [match] = self._match_vectors(np.array([vector], dtype=np.float32))
+        if match is not None:
+            metrics.inc("entity_matches_total")
             # if it already exists, then take existing entity
-            s_entity = self.doc_to_entity[s[0][0].page_content]
-        else:
-            logger.debug("miss for subject: {}", subject)
-            # if doesn't exist, add the entity to the vectorebase
-            s_entity = Entity(name=subject)
-            s_doc = Document(page_content=subject)
-            self.vectorstore.add_documents([s_doc])
-            self.doc_to_entity[s_doc.page_content] = s_entity
-        if len(o) and o[0][1] > self.match_threshold:
-            logger.debug("match for object: {}", object_)
-            o_entity = self.doc_to_entity[o[0][0].page_content]
-        else:
-            logger.debug("miss for object: {}", object_)
-            o_entity = Entity(name=object_)
-            o_doc = Document(page_content=object_)
-            self.vectorstore.add_documents([o_doc])
-            self.doc_to_entity[o_doc.page_content] = o_entity
-        return KGTriple(s_entity, predicate, o_entity, url)
+            self.lexical_index.add(name, match.name)
+            return match
+        metrics.inc("entity_misses_total")
+        # if doesn't exist, add the entity to the vectorebase
+        entity = self.doc_to_entity[name] = Entity(name=name)
+        self._add_entity_vectors([(name, vector)])
+        self.lexical_index.add(name)
+        return entity
+
+    ## Merging partial builders
+    def to_shard(self) -> BuilderShard:
+        names, vectors = self.get_entity_vectors()
+        return BuilderShard(
+            entity_names=names,
+            entity_types=[get_type_name(self.doc_to_entity[n]) for n in names],
+            vectors=vectors,
+            triples=[
+                (t.subject.name, t.predicate, t.object_.name, t.url, t.timestamp)
+                for t in self.triples
+            ],
+        )
+
+    def merge_shard(self, shard: BuilderShard) -> None:
+        """
+        Adds the triples of a partial builder, resolving its entities against
+        the existing ones by vector similarity without re-embedding them.
+        """
+        if shard.metrics is not None:
+            metrics.REGISTRY.merge(shard.metrics)
+        entities = self.merge_entities(
+            shard.entity_names, shard.entity_types, shard.vectors
+        )
+        self.add_triples(
+            KGTriple(entities[s], p, entities[o], url, timestamp)
+            for s, p, o, url, timestamp in shard.triples
+        )
+        logger.info(
+            "merged shard: {} entities, {} triples",
+            len(shard.entity_names),
+            len(shard.triples),
+        )
+
+    def merge_entities(
+        self,
+        names: List[str],
+        type_names: List[Optional[str]],
+        vectors: np.ndarray,
+    ) -> Dict[str, Entity]:
+        """
+        Maps each name to the existing entity it matches, or to a new entity
+        added with its given type and vector.
+        """
+        if len(vectors) and vectors.shape[1] != self.vectorstore.index.d:
+            raise ValueError(
+                f"got {vectors.shape[1]}-d vectors for a {self.vectorstore.index.d}-d"
+                " index, were they made with a different embedding model?"
+            )
+        entities: Dict[str, Entity] = {}
+        new_entities: List[Tuple[str, np.ndarray]] = []
+        matches = self._match_vectors(vectors)
+        for name, type_name, vector, match in zip(names, type_names, vectors, matches):
+            exact = self.lexical_index.exact(name)
+            if exact is not None:
+                match = self.doc_to_entity[exact]
+            if match is not None:
+                entities[name] = match
+                continue
+            is_a = self.class_entities.get(type_name or "", RootEntity)
+            entities[name] = self.doc_to_entity[name] = Entity(name=name, is_a=is_a)
+            self._index_type(entities[name])
+            self.lexical_index.add(name)
+            new_entities.append((name, vector))
+        if new_entities:
+            self._add_entity_vectors(new_entities)
+        logger.debug("merged {} entities ({} new)", len(names), len(new_entities))
+        return entities
+
+    def _add_entity_vectors(
+        self, entities: Sequence[Tuple[str, Sequence[float]]]
+    ) -> None:
+        # FAISS.add_embeddings numbers new vectors after the existing ones
+        start = len(self.vectorstore.index_to_docstore_id)
+        self.vectorstore.add_embeddings(entities)
+        for offset, (name, _) in enumerate(entities):
+            self.entity_index_ids[name] = start + offset
+
+    def _match_vectors(self, vectors: np.ndarray) -> List[Optional[Entity]]:
+        if not len(vectors):
+            return []
+        relevance_score_fn = self.vectorstore._select_relevance_score_fn()
+        scores, index_ids = self.vectorstore.index.search(vectors, 1)
+        matches: List[Optional[Entity]] = []
+        for score, index_id in zip(scores[:, 0], index_ids[:, 0]):
+            match = None
+            if index_id != -1 and relevance_score_fn(score) > self.match_threshold:
+                doc_id = self.vectorstore.index_to_docstore_id[index_id]
+                doc = self.vectorstore.docstore.search(doc_id)
+                if isinstance(doc, Document):
+                    match = self.doc_to_entity.get(doc.page_content)
+            matches.append(match)
+        return matches
+
+    def get_entity_vectors(self) -> Tuple[List[str], np.ndarray]:
+        """Names of all entities and their vectors as stored in the index"""
+        index_ids: List[int] = []
+        names: List[str] = []
+        for index_id, doc_id in self.vectorstore.index_to_docstore_id.items():
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document) and doc.page_content in self.doc_to_entity:
+                index_ids.append(index_id)
+                names.append(doc.page_content)
+        vectors = np.zeros((len(names), self.vectorstore.index.d), dtype=np.float32)
+        for row, index_id in enumerate(index_ids):
+            vectors[row] = self.vectorstore.index.reconstruct(index_id)
+        return names, vectors
+
+    ## Time partitioning
+    @property
+    def triples(self) -> List[KGTriple]:
+        buckets = sorted(self.triple_buckets.items())
+        return list(itertools.chain.from_iterable(t for _, t in buckets))
+
+    def add_triples(
+        self, triples: Iterable[KGTriple], auto_compact: bool = True
+    ) -> None:
+        """
+        Pass `auto_compact=False` when adding triples in several parts, and
+        compact once at the end: an early compaction drops the entities that
+        only appear in the later parts.
+        """
+        for triple in triples:
+            bucket = int(triple.timestamp // self.time_bucket_seconds)
+            self.triple_buckets.setdefault(bucket, []).append(triple)
+        if auto_compact and self.max_age is not None:
+            self.compact(self.max_age)
+
+    def triples_in_window(
+        self, window: float, now: Optional[float] = None
+    ) -> List[KGTriple]:
+        """Triples from the last `window` seconds, e.g. 24 * 60 * 60 for a day"""
+        since = (time.time() if now is None else now) - window
+        first_bucket = int(since // self.time_bucket_seconds)
+        return [
+            t
+            for bucket, triples in sorted(self.triple_buckets.items())
+            if bucket >= first_bucket
+            for t in triples
+            if t.timestamp >= since
+        ]
+
+    def compact(self, max_age: float, now: Optional[float] = None) -> None:
+        """
+        Drops triples older than `max_age` seconds together with the entities
+        that no longer appear in any triple. Only runs once a whole time bucket
+        has expired, as it rebuilds the vector index.
+        """
+        since = (time.time() if now is None else now) - max_age
+        first_bucket = int(since // self.time_bucket_seconds)
+        expired = [b for b in self.triple_buckets if b < first_bucket]
+        if not expired:
+            return
+        for bucket in expired:
+            del self.triple_buckets[bucket]
+
+        alive: Set[str] = set()
+        for triple in itertools.chain.from_iterable(self.triple_buckets.values()):
+            alive.add(triple.subject.name)
+            alive.add(triple.object_.name)
+        orphans = [e for name, e in self.doc_to_entity.items() if name not in alive]
+        for entity in orphans:
+            del self.doc_to_entity[entity.name]
+            self.entity_typer.cache.pop(entity.name, None)
+            for ancestor in get_ancestors(entity):
+                self.type_index[ancestor.name].discard(entity)
+
+        names, vectors = self.get_entity_vectors()
+        self.lexical_index = self.lexical_index.retain(self.doc_to_entity)
+        self.vectorstore = get_faiss_vectorstore(self.embeddings, self.index_config)
+        self.entity_index_ids = {}
+        if names:
+            self._add_entity_vectors(list(zip(names, vectors)))
+        logger.info(
+            "compacted {} time buckets, removed {} entities", len(expired), len(orphans)
+        )
+
+    ## Typing entities
+    def assign_types(self, triples: Iterable[KGTriple]) -> None:
+        untyped: Dict[str, Entity] = {}
+        for triple in triples:
+            for entity in (triple.subject, triple.object_):
+                if entity.is_a is None:
+                    untyped[entity.name] = entity
+        with metrics.span("entity_typing"):
+            type_names = self.entity_typer.classify(list(untyped))
+        for entity, type_name in zip(untyped.values(), type_names):
+            entity.is_a = self.class_entities[type_name] if type_name else RootEntity
+            self._index_type(entity)
+
+    def _index_type(self, entity: Entity) -> None:
+        for ancestor in get_ancestors(entity):
+            self.type_index[ancestor.name].add(entity)
+
+    def entities_of_type(self, type_name: str) -> Set[Entity]:
+        """Entities typed as `type_name` or any of its subclasses"""
+        return self.type_index.get(type_name, set())
 
     @property
-    def graph(self) -> nx.Graph:
-        def convert_to_graph(triples: List[KGTriple]) -> nx.Graph:
-            graph = nx.Graph()
+    def graph(self) -> nx.MultiDiGraph:
+        return self.get_graph()
+
+    def get_graph(self, window: Optional[float] = None) -> nx.MultiDiGraph:
+        """
+        The knowledge graph, optionally of the last `window` seconds only.
+        There is one edge per distinct (subject, predicate, object), keyed by
+        the predicate, that counts how many triples support it.
+        """
+
+        def convert_to_graph(triples: List[KGTriple]) -> nx.MultiDiGraph:
+            graph = nx.MultiDiGraph()
             for triple in triples:
                 subject = triple.subject
                 predicate = triple.predicate
                 object_ = triple.object_
-                graph.add_node(subject)
-                graph.add_node(object_)
-                graph.add_edge(subject, object_, label=predicate)
+                for node in (subject, object_):
+                    if not graph.has_node(node):
+                        graph.add_node(node, **{TYPE_ATTR: get_type_name(node)})
+                if graph.has_edge(subject, object_, key=predicate):
+                    edge = graph.edges[subject, object_, predicate]
+                    edge[SUPPORT_ATTR] += 1
+                else:
+                    graph.add_edge(
+                        subject,
+                        object_,
+                        key=predicate,
+                        label=predicate,
+                        **{SUPPORT_ATTR: 1},
+                    )
+                    edge = graph.edges[subject, object_, predicate]
 
                 add_source_metadata(graph.nodes[subject], triple.url)
                 add_source_metadata(graph.nodes[object_], triple.url)
-                add_source_metadata(graph.edges[subject, object_], triple.url)
+                add_source_metadata(edge, triple.url)
 
             return graph
 
-        return convert_to_graph(self.triples)
+        with metrics.span("graph_build"):
+            if window is None:
+                return convert_to_graph(self.triples)
+            return convert_to_graph(self.triples_in_window(window))
 
     def search(self, q: str):
         return self.vectorstore.similarity_search(q)
 
+    def search_entities(
+        self,
+        query: str,
+        k: int = DEFAULT_SEARCH_K,
+        entity_type: Optional[str] = None,
+    ) -> List[Tuple[Entity, float]]:
+        """
+        Entities by name, best first, optionally only those of `entity_type`
+        (or its subclasses). An exact lexical hit is returned first, followed
+        by the other lexical matches, and skips embedding the query; otherwise
+        lexical and vector results are merged by reciprocal rank fusion, so
+        scores only order the results of one call.
+        """
+        candidates: Optional[Set[str]] = None
+        if entity_type is not None:
+            candidates = {e.name for e in self.entities_of_type(entity_type)}
+            if not candidates:
+                return []
+        with metrics.span("lexical_search"):
+            lexical = self.lexical_index.search(query, k, entity_names=candidates)
+        exact = self.lexical_index.exact(query)
+        if exact is not None and (candidates is None or exact in candidates):
+            metrics.inc("entity_search_exact_total")
+            # trigrams ignore symbols, "C++" may rank "C" first
+            others = [(n, s) for n, s in lexical if n != exact][: k - 1]
+            return [
+                (self.doc_to_entity[name], score)
+                for name, score in [(exact, 1.0)] + others
+            ]
+        with metrics.span("vector_search"):
+            if candidates is None:
+                results = self.vectorstore.similarity_search_with_relevance_scores(
+                    query, k=k
+                )
+                dense = [
+                    doc.page_content
+                    for doc, _ in results
+                    if doc.page_content in self.doc_to_entity  # not "root"
+                ]
+            else:
+                dense = self._rank_by_vector(query, list(candidates), k)
+        fused = lexical_index.reciprocal_rank_fusion([n for n, _ in lexical], dense)
+        return [(self.doc_to_entity[name], score) for name, score in fused[:k]]
+
+    def _rank_by_vector(self, query: str, names: List[str], k: int) -> List[str]:
+        """Vector search restricted to the vectors of `names`"""
+        ids = [self.entity_index_ids[n] for n in names if n in self.entity_index_ids]
+        if not ids:
+            return []
+        query_vector = np.array([self.embeddings.embed_query(query)], dtype=np.float32)
+        _, index_ids = self.vectorstore.index.search(query_vector, k, ids=ids)
+        ranked: List[str] = []
+        for index_id in index_ids[0]:
+            if index_id == -1:
+                continue
+            doc_id = self.vectorstore.index_to_docstore_id[index_id]
+            doc = self.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                ranked.append(doc.page_content)
+        return ranked
+
     def is_in_llm_cache(self, text: str) -> bool:
         hit = text in self.llm_cache
-        if hit:
-            logger.debug("cache <green>hit</green> for content: {}", text[:18])
-        else:
-            logger.debug("cache <red>miss</red> for content: {}", text[:18])
+        metrics.inc("llm_cache_hits_total" if hit else "llm_cache_misses_total")
         return hit
 
 
+def build_shard(
+    contents: List[base.Content], builder_factory: Callable[[], LLMGraphBuilder]
+) -> BuilderShard:
+    """
+    Runs in a worker process. The worker's metrics are reset first, as pool
+    processes are reused and may inherit the parent's metrics, and are
+    returned with the shard.
+    """
+    metrics.REGISTRY.clear()
+    builder = builder_factory()
+    builder.add_content_batch(contents)
+    return builder.to_shard()._replace(metrics=metrics.REGISTRY.to_dict())
+
+
+def get_timestamp(content: base.Content) -> float:
+    return content.timestamp if content.timestamp is not None else time.time()
+
+
 def add_source_metadata(node_or_edge_dict: Dict, source: str) -> None:
-    node_or_edge_dict[SOURCE_ATTR] = node_or_edge_dict.get(SOURCE_ATTR, [])
-    node_or_edge_dict[SOURCE_ATTR].append(source)
+    sources: List[str] = node_or_edge_dict.setdefault(SOURCE_ATTR, [])
+    if source in sources:
+        return
+    if len(sources) >= MAX_SOURCES:
+        sources.pop(0)
+    sources.append(source)
 
 
-def get_faiss_vectorstore(embedder: embeddings_base.Embeddings) -> FAISS:
+def get_class_entities(classes: List[ontology.OntologyClass]) -> Dict[str, Entity]:
+    parents = {c.name: c.parent for c in classes}
+    class_entities: Dict[str, Entity] = {}
+
+    def get_class_entity(name: str) -> Entity:
+        if name not in class_entities:
+            parent = parents.get(name)
+            is_a = get_class_entity(parent) if parent else RootEntity
+            class_entities[name] = Entity(name=name, is_a=is_a)
+        return class_entities[name]
+
+    for c in classes:
+        get_class_entity(c.name)
+    return class_entities
+
+
+def get_ancestors(entity: Entity) -> Iterator[Entity]:
+    """Class entities above `entity`, most specific first, excluding root"""
+    parent = entity.is_a
+    while parent is not None and parent != RootEntity:
+        yield parent
+        parent = parent.is_a
+
+
+def get_type_name(entity: Entity) -> Optional[str]:
+    if entity.is_a is None or entity.is_a == RootEntity:
+        return None
+    return entity.is_a.name
+
+
+def get_faiss_vectorstore(
+    embedder: embeddings_base.Embeddings,
+    index_config: Optional[vector_index.IndexConfig] = None,
+) -> FAISS:
     if isinstance(embedder, openai_embeddings.OpenAIEmbeddings):
         name = embedder.model
     else:
         name = embedder.__class__.__name__
         logger.warning("Unknown llm type: {}", name)
-    return FAISS.from_texts(["root"], embedding=embedder)  # type: ignore
+    index_config = index_config or vector_index.IndexConfig()
+    root_embedding = embedder.embed_query(RootEntity.name)
+    index = vector_index.VectorIndex(len(root_embedding), index_config)
+    if index_config.metric == "cosine":
+        vectorstore = FAISS(
+            embedder.embed_query,
+            index,
+            InMemoryDocstore({}),
+            {},
+            relevance_score_fn=vector_index.cosine_relevance_score,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+    else:
+        vectorstore = FAISS(embedder.embed_query, index, InMemoryDocstore({}), {})
+    vectorstore.add_embeddings([(RootEntity.name, root_embedding)])
+    return vectorstore
 
 
 def get_chroma_vectorstore(embedder: embeddings_base.Embeddings) -> Chroma:
@@ -0,0 +1,406 @@
+"""
+Exporting and importing the entities, triples and sources of a LLMGraphBuilder
+without pickle.
+
+- columnar: an `entities` table (name, type, vector) and a `triples` table
+  (subject and object row ids, predicate, url, timestamp) as Parquet or Arrow
+  IPC files when pyarrow is installed (the `columnar` extra), or a single
+  NumPy `graph.npz` otherwise. Round-trips everything the builder needs, see
+  `read_columnar`.
+- N-Triples and Turtle: written statement by statement from the triples,
+  with an rdfs:label per entity and rdf:type for typed entities.
+- GraphML: the derived multigraph for tools like Gephi or yEd, with the
+  sources of each node and edge joined by spaces.
+"""
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+from urllib.parse import quote
+
+import networkx as nx
+import numpy as np
+from loguru import logger
+
+from know_net import graph_building, ontology, turtle
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, columnar exports fall back to npz
+    pa = pq = None
+
+CHUNK_SIZE = 100_000  # triples per row group / record batch
+ONT_NS = "http://www.semanticweb.org/ontologies/technology#"
+ENTITY_NS = "http://www.semanticweb.org/ontologies/technology/entity/"
+RELATION_NS = "http://www.semanticweb.org/ontologies/technology/relation/"
+PREFIXES = {
+    "": ONT_NS,
+    "entity": ENTITY_NS,
+    "rel": RELATION_NS,
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+}
+COLUMNAR_FORMATS = ("parquet", "arrow", "npz")
+NPZ_FILE = "graph.npz"
+
+
+## Columnar
+def write_columnar(
+    builder: graph_building.LLMGraphBuilder,
+    output_dir: str,
+    fmt: Optional[str] = None,
+) -> None:
+    """
+    Writes `entities.<fmt>` and `triples.<fmt>` (or `graph.npz`) to
+    `output_dir`. Triples are encoded and written CHUNK_SIZE at a time.
+    """
+    fmt = fmt or ("parquet" if pa is not None else "npz")
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"unknown columnar format {fmt!r}")
+    if fmt != "npz" and pa is None:
+        raise ImportError(f"{fmt} export requires pyarrow, use fmt='npz'")
+    os.makedirs(output_dir, exist_ok=True)
+
+    names, vectors = builder.get_entity_vectors()
+    types = [graph_building.get_type_name(builder.doc_to_entity[n]) for n in names]
+    rows = {name: row for row, name in enumerate(names)}
+    triples = builder.triples
+    if fmt == "npz":
+        _write_npz(
+            os.path.join(output_dir, NPZ_FILE), names, types, vectors, triples, rows
+        )
+    else:
+        _write_arrow(output_dir, fmt, names, types, vectors, triples, rows)
+    logger.info(
+        "exported {} entities, {} triples to {} ({})",
+        len(names),
+        len(triples),
+        output_dir,
+        fmt,
+    )
+
+
+def read_columnar(
+    builder: graph_building.LLMGraphBuilder, input_dir: str
+) -> graph_building.LLMGraphBuilder:
+    """
+    Adds an exported graph to `builder`. Entities are merged by vector
+    similarity without re-embedding, as in LLMGraphBuilder.merge_shard, so
+    importing into a fresh builder restores the exported one.
+    """
+    npz_path = os.path.join(input_dir, NPZ_FILE)
+    if os.path.exists(npz_path):
+        names, types, vectors, chunks = _read_npz(npz_path)
+    else:
+        names, types, vectors, chunks = _read_arrow(input_dir)
+    merged = builder.merge_entities(names, types, vectors)
+    entities = [merged[name] for name in names]
+    n_triples = 0
+    for subjects, predicates, objects, urls, timestamps in chunks:
+        builder.add_triples(
+            (
+                graph_building.KGTriple(entities[s], p, entities[o], url, ts)
+                for s, p, o, url, ts in zip(
+                    subjects, predicates, objects, urls, timestamps
+                )
+            ),
+            auto_compact=False,
+        )
+        n_triples += len(subjects)
+    if builder.max_age is not None:
+        builder.compact(builder.max_age)
+    logger.info(
+        "imported {} entities, {} triples from {}", len(names), n_triples, input_dir
+    )
+    return builder
+
+
+_TripleChunk = Tuple[List[int], List[str], List[int], List[str], List[float]]
+
+
+def _encode_chunk(
+    triples: Sequence[graph_building.KGTriple], rows: Dict[str, int]
+) -> _TripleChunk:
+    return (
+        [rows[t.subject.name] for t in triples],
+        [t.predicate for t in triples],
+        [rows[t.object_.name] for t in triples],
+        [t.url for t in triples],
+        [t.timestamp for t in triples],
+    )
+
+
+def _write_arrow(
+    output_dir: str,
+    fmt: str,
+    names: List[str],
+    types: List[Optional[str]],
+    vectors: np.ndarray,
+    triples: List[graph_building.KGTriple],
+    rows: Dict[str, int],
+) -> None:
+    entities = pa.table(
+        {
+            "name": pa.array(names, pa.string()),
+            "type": pa.array(types, pa.string()),
+            "vector": pa.FixedSizeListArray.from_arrays(
+                pa.array(vectors.ravel(), pa.float32()), vectors.shape[1]
+            ),
+        }
+    )
+    schema = pa.schema(
+        [
+            ("subject", pa.int32()),
+            ("predicate", pa.string()),
+            ("object", pa.int32()),
+            ("url", pa.string()),
+            ("timestamp", pa.float64()),
+        ]
+    )
+    entities_path = os.path.join(output_dir, f"entities.{fmt}")
+    triples_path = os.path.join(output_dir, f"triples.{fmt}")
+    if fmt == "parquet":
+        pq.write_table(entities, entities_path)
+        writer = pq.ParquetWriter(triples_path, schema)
+    else:
+        with pa.ipc.new_file(entities_path, entities.schema) as entities_writer:
+            entities_writer.write_table(entities)
+        writer = pa.ipc.new_file(triples_path, schema)
+    with writer:
+        for start in range(0, len(triples), CHUNK_SIZE):
+            chunk = _encode_chunk(triples[start : start + CHUNK_SIZE], rows)
+            writer.write_table(pa.Table.from_arrays(list(chunk), schema=schema))
+
+
+def _read_arrow(
+    input_dir: str,
+) -> Tuple[List[str], List[Optional[str]], np.ndarray, Iterator[_TripleChunk]]:
+    if pa is None:
+        raise ImportError(f"reading {input_dir} requires pyarrow")
+    if os.path.exists(os.path.join(input_dir, "entities.parquet")):
+        entities = pq.read_table(os.path.join(input_dir, "entities.parquet"))
+        batches = _iter_parquet(os.path.join(input_dir, "triples.parquet"))
+    else:
+        with pa.memory_map(os.path.join(input_dir, "entities.arrow")) as source:
+            entities = pa.ipc.open_file(source).read_all()
+        batches = _iter_arrow(os.path.join(input_dir, "triples.arrow"))
+
+    vector_column = entities.column("vector").combine_chunks()
+    dim = vector_column.type.list_size
+    vectors = vector_column.flatten().to_numpy().reshape(-1, dim)
+    chunks = (
+        tuple(_to_list(batch.column(i)) for i in range(batch.num_columns))
+        for batch in batches
+    )
+    return (
+        entities.column("name").to_pylist(),
+        entities.column("type").to_pylist(),
+        vectors.astype(np.float32),
+        chunks,  # type: ignore
+    )
+
+
+def _iter_parquet(path: str) -> Iterator["pa.RecordBatch"]:
+    """Record batches of `path`, the file is closed once they are exhausted"""
+    with pq.ParquetFile(path) as source:
+        yield from source.iter_batches(batch_size=CHUNK_SIZE)
+
+
+def _iter_arrow(path: str) -> Iterator["pa.RecordBatch"]:
+    """Record batches of `path`, unmapped once they are exhausted"""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+def _to_list(array: "pa.Array") -> list:
+    """Faster than to_pylist for the repetitive predicate and url columns"""
+    if pa.types.is_string(array.type):
+        encoded = array.dictionary_encode()
+        values = encoded.dictionary.to_pylist()
+        return [values[i] for i in encoded.indices.to_numpy()]
+    return array.to_numpy().tolist()
+
+
+def _write_npz(
+    path: str,
+    names: List[str],
+    types: List[Optional[str]],
+    vectors: np.ndarray,
+    triples: List[graph_building.KGTriple],
+    rows: Dict[str, int],
+) -> None:
+    predicates: Dict[str, int] = {}
+    urls: Dict[str, int] = {}
+    columns = {
+        "subject": np.empty(len(triples), dtype=np.int32),
+        "object": np.empty(len(triples), dtype=np.int32),
+        "predicate": np.empty(len(triples), dtype=np.int32),
+        "url": np.empty(len(triples), dtype=np.int32),
+        "timestamp": np.empty(len(triples), dtype=np.float64),
+    }
+    for start in range(0, len(triples), CHUNK_SIZE):
+        chunk = triples[start : start + CHUNK_SIZE]
+        subjects, chunk_predicates, objects, chunk_urls, timestamps = _encode_chunk(
+            chunk, rows
+        )
+        end = start + len(chunk)
+        columns["subject"][start:end] = subjects
+        columns["object"][start:end] = objects
+        columns["timestamp"][start:end] = timestamps
+        columns["predicate"][start:end] = [
+            predicates.setdefault(p, len(predicates)) for p in chunk_predicates
+        ]
+        columns["url"][start:end] = [urls.setdefault(u, len(urls)) for u in chunk_urls]
+    np.savez(
+        path,
+        entity_names=np.array(names, dtype=str),
+        entity_types=np.array([t or "" for t in types], dtype=str),
+        vectors=vectors,
+        predicates=np.array(list(predicates), dtype=str),
+        urls=np.array(list(urls), dtype=str),
+        **columns,
+    )
+
+
+def _read_npz(
+    path: str,
+) -> Tuple[List[str], List[Optional[str]], np.ndarray, Iterator[_TripleChunk]]:
+    data = np.load(path, allow_pickle=False)
+    predicates = data["predicates"].tolist()
+    urls = data["urls"].tolist()
+    columns = [data[c] for c in ("subject", "predicate", "object", "url", "timestamp")]
+
+    def chunks() -> Iterator[_TripleChunk]:
+        subject, predicate, object_, url, timestamp = columns
+        for start in range(0, len(subject), CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            yield (
+                subject[start:end].tolist(),
+                [predicates[i] for i in predicate[start:end]],
+                object_[start:end].tolist(),
+                [urls[i] for i in url[start:end]],
+                timestamp[start:end].tolist(),
+            )
+
+    return (
+        data["entity_names"].tolist(),
+        [t or None for t in data["entity_types"].tolist()],
+        data["vectors"].astype(np.float32),
+        chunks(),
+    )
+
+
+## RDF
+def entity_term(name: str) -> str:
+    """Percent-encoded, so that "A B" and "A_B" stay distinct entities"""
+    return turtle.iri_term(ENTITY_NS + quote(name, safe=""))
+
+
+def relation_term(predicate: str) -> str:
+    return turtle.iri_term(RELATION_NS + quote(predicate, safe=""))
+
+
+def iter_statements(
+    builder: graph_building.LLMGraphBuilder,
+) -> Iterator[turtle.Statement]:
+    """Labels and types of the entities followed by one statement per triple"""
+    entity_terms: Dict[str, str] = {}
+    relation_terms: Dict[str, str] = {}
+    for name, entity in builder.doc_to_entity.items():
+        subject = entity_terms[name] = entity_term(name)
+        label = f'"{turtle.escape_literal(name)}"'
+        yield turtle.Statement(subject, ontology.RDFS_LABEL, label)
+        type_name = graph_building.get_type_name(entity)
+        if type_name is not None:
+            type_term = turtle.iri_term(ONT_NS + type_name)
+            yield turtle.Statement(subject, turtle.RDF_TYPE, type_term)
+    for triple in builder.triples:
+        if triple.predicate not in relation_terms:
+            relation_terms[triple.predicate] = relation_term(triple.predicate)
+        yield turtle.Statement(
+            entity_terms[triple.subject.name],
+            relation_terms[triple.predicate],
+            entity_terms[triple.object_.name],
+        )
+
+
+def write_ntriples(builder: graph_building.LLMGraphBuilder, path: str) -> None:
+    with open(path, "w") as f:
+        _write_lines(f, map(turtle.to_ntriples, iter_statements(builder)))
+
+
+def write_turtle(builder: graph_building.LLMGraphBuilder, path: str) -> None:
+    """
+    Unlike turtle.to_turtle statements are not grouped by subject, so the
+    document is written as it is generated.
+    """
+    compacted: Dict[str, str] = {turtle.RDF_TYPE: "a"}
+
+    def compact(term: str) -> str:
+        if not term.startswith("<"):
+            return turtle.compact(term, PREFIXES)
+        if term not in compacted:
+            compacted[term] = turtle.compact(term, PREFIXES)
+        return compacted[term]
+
+    def lines() -> Iterator[str]:
+        for s, p, o in iter_statements(builder):
+            yield f"{compact(s)} {compact(p)} {compact(o)} .\n"
+
+    with open(path, "w") as f:
+        f.write(turtle.prefix_block(PREFIXES))
+        _write_lines(f, lines())
+
+
+def _write_lines(f: TextIO, lines: Iterator[str], chunk_size: int = 10_000) -> None:
+    chunk: List[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            f.write("".join(chunk))
+            chunk.clear()
+    f.write("".join(chunk))
+
+
+## GraphML
+def write_graphml(
+    builder: graph_building.LLMGraphBuilder,
+    path: str,
+    window: Optional[float] = None,
+) -> None:
+    """
+    GraphML has no list or null attributes: nodes are keyed by entity name,
+    sources are joined by spaces and untyped nodes get an empty type.
+    """
+    graph = builder.get_graph(window)
+    export = nx.MultiDiGraph()
+    for node, data in graph.nodes(data=True):
+        export.add_node(
+            node.name,
+            **{
+                graph_building.TYPE_ATTR: data[graph_building.TYPE_ATTR] or "",
+                graph_building.SOURCE_ATTR: " ".join(data[graph_building.SOURCE_ATTR]),
+            },
+        )
+    for subject, object_, key, data in graph.edges(keys=True, data=True):
+        export.add_edge(
+            subject.name,
+            object_.name,
+            key=key,
+            label=data["label"],
+            **{
+                graph_building.SUPPORT_ATTR: data[graph_building.SUPPORT_ATTR],
+                graph_building.SOURCE_ATTR: " ".join(data[graph_building.SOURCE_ATTR]),
+            },
+        )
+    nx.write_graphml(export, path)
+
+
+def read_graphml(path: str) -> nx.MultiDiGraph:
+    """The graph of `write_graphml` with node and edge sources split again"""
+    graph = nx.read_graphml(path, force_multigraph=True)
+    for _, data in graph.nodes(data=True):
+        data[graph_building.SOURCE_ATTR] = data[graph_building.SOURCE_ATTR].split()
+    for _, _, data in graph.edges(data=True):
+        data[graph_building.SOURCE_ATTR] = data[graph_building.SOURCE_ATTR].split()
+    return graph
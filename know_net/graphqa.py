@@ -4,7 +4,8 @@ to query vectors
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, NamedTuple
+from concurrent import futures
+from typing import Any, Dict, List, Optional, NamedTuple, Tuple
 import networkx as nx
 import itertools
 import loguru
@@ -12,11 +13,13 @@ from langchain.chains import GraphQAChain
 from langchain.callbacks.manager import CallbackManagerForChainRun
 from langchain.graphs.networkx_graph import get_entities
 from know_net.graph_building import LLMGraphBuilder
-from know_net import graph_building
+from know_net import graph_building, metrics
 from know_net.graph_building import Entity
 
 logger = loguru.logger
 
+MAX_ENTITY_TRIPLES = 50
+
 
 class EntityKnowledge(NamedTuple):
     triplet_string: str
@@ -26,6 +29,11 @@ class EntityKnowledge(NamedTuple):
 class VecGraphQAChain(GraphQAChain):
     """Chain for question-answering against a graph."""
 
+    entity_type: Optional[str] = None
+    """If set, only entities of this ontology class (or its subclasses) are used"""
+    window: Optional[float] = None
+    """If set, only triples from the last `window` seconds are used"""
+
     def _call(
         self,
         inputs: Dict[str, Any],
@@ -35,7 +43,8 @@ class VecGraphQAChain(GraphQAChain):
         _run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
         question = inputs[self.input_key]
 
-        entity_string = self.entity_extraction_chain.run(question)
+        with metrics.span("qa_entity_extraction"):
+            entity_string = self.entity_extraction_chain.run(question)
 
         _run_manager.on_text("Entities Extracted:", end="\n", verbose=self.verbose)
         _run_manager.on_text(
@@ -45,46 +54,93 @@ class VecGraphQAChain(GraphQAChain):
         logger.info("found entities: {}", entities)
         context = ""
         all_triplets: List[EntityKnowledge] = []
-        for entity in entities:
-            all_triplets.extend(get_entity_knowledge(self.graph, entity))
-            # all_triplets.extend(self.graph.get_entity_knowledge(entity))
+        with metrics.span("qa_context"):
+            all_triplets = get_entities_knowledge(
+                self.graph, entities, self.entity_type, self.window
+            )
         context = "\n".join(t.triplet_string for t in all_triplets)
         _run_manager.on_text("Full Context:", end="\n", verbose=self.verbose)
         _run_manager.on_text(context, color="green", end="\n", verbose=self.verbose)
-        result = self.qa_chain(
-            {"question": question, "context": context},
-            callbacks=_run_manager.get_child(),
-        )
+        with metrics.span("qa_answer"):
+            result = self.qa_chain(
+                {"question": question, "context": context},
+                callbacks=_run_manager.get_child(),
+            )
 
         references = itertools.chain.from_iterable(t.references for t in all_triplets)
         urls = "\n".join(set(references))
         return {self.output_key: result[self.qa_chain.output_key], "references": urls}
 
 
+def get_entities_knowledge(
+    graph: LLMGraphBuilder,
+    entity_strs: List[str],
+    entity_type: Optional[str] = None,
+    window: Optional[float] = None,
+) -> List[EntityKnowledge]:
+    """
+    Looks the entities up concurrently, so that their query embeddings are
+    computed in one batch when the builder batches embeddings.
+    """
+    if not entity_strs:
+        return []
+    nx_graph = graph.get_graph(window)
+    n_threads = min(len(entity_strs), graph_building.MAX_EMBEDDER_CONCURRENCY)
+    with futures.ThreadPoolExecutor(n_threads) as pool:
+        knowledge = pool.map(
+            lambda e: get_entity_knowledge(graph, e, entity_type, window, nx_graph),
+            entity_strs,
+        )
+        return list(itertools.chain.from_iterable(knowledge))
+
+
 def get_entity_knowledge(
-    graph: LLMGraphBuilder, entity_str: str
+    graph: LLMGraphBuilder,
+    entity_str: str,
+    entity_type: Optional[str] = None,
+    window: Optional[float] = None,
+    nx_graph: Optional[nx.MultiDiGraph] = None,
 ) -> List[EntityKnowledge]:
     triplets: List[EntityKnowledge] = []
-    results = graph.vectorstore.similarity_search_with_relevance_scores(entity_str)
-    for doc, _ in results:
-        entity = graph.doc_to_entity[doc.page_content]
+    results = graph.search_entities(entity_str, entity_type=entity_type)
+    if nx_graph is None:
+        nx_graph = graph.get_graph(window)
+    for entity, _ in results:
+        if not nx_graph.has_node(entity):  # e.g. only has triples outside window
+            continue
         logger.info("entity:{}", entity)
-        trip_str = str(get_entity_triples(graph.graph, entity))
-        references = graph.graph.nodes[entity][graph_building.SOURCE_ATTR]
+        trip_str = str(get_entity_triples(nx_graph, entity))
+        references = nx_graph.nodes[entity][graph_building.SOURCE_ATTR]
         logger.info("trip str: {}", trip_str)
         logger.info("urls: {}", set(references))
         triplets.append(EntityKnowledge(triplet_string=trip_str, references=references))
     return triplets
 
 
-def get_entity_triples(graph: nx.Graph, entity: Entity, depth: int = 1) -> List[str]:
-    """Get information about an entity."""
+def get_entity_triples(
+    graph: nx.MultiDiGraph,
+    entity: Entity,
+    depth: int = 1,
+    max_triples: Optional[int] = MAX_ENTITY_TRIPLES,
+) -> List[str]:
+    """
+    Get information about an entity: the edges within `depth` hops of it in
+    either direction, most supported first.
+    """
 
     if not graph.has_node(entity):
         return []
 
-    results: List[str] = []
-    for src, sink in nx.dfs_edges(graph, entity, depth_limit=depth):
-        relation = graph[src][sink]["label"]
-        results.append(f"({src.name}, {relation}, {sink.name})")
-    return results
+    nodes = nx.single_source_shortest_path_length(
+        graph.to_undirected(as_view=True), entity, cutoff=depth - 1
+    )
+    edges: Dict[Tuple[Entity, Entity, str], int] = {}
+    for node in nodes:
+        incident = itertools.chain(
+            graph.out_edges(node, keys=True, data=graph_building.SUPPORT_ATTR),
+            graph.in_edges(node, keys=True, data=graph_building.SUPPORT_ATTR),
+        )
+        for src, sink, relation, support in incident:
+            edges[src, sink, relation] = support
+    ranked = sorted(edges, key=edges.__getitem__, reverse=True)[:max_triples]
+    return [f"({src.name}, {relation}, {sink.name})" for src, sink, relation in ranked]
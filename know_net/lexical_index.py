@@ -0,0 +1,143 @@
+"""
+In-memory lexical index over entity names: exact lookups on normalized names
+and BM25 over character trigrams for near-exact ones ("iPhone12", "S.E.C.").
+Exact keys keep the symbols that tell names apart ("C", "C++", "C#"), near-exact
+matches do not and should be confirmed by other means.
+Aliases, names that were resolved to an entity by other means, are indexed
+too and point to the entity's name.
+"""
+import collections
+import math
+import re
+from typing import Container, Dict, Iterable, List, Optional, Tuple
+
+NGRAM_SIZE = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_MIN_LEXICAL_SCORE = 0.5
+RRF_K = 60  # reciprocal rank fusion constant
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_EXACT_PUNCT_RE = re.compile(r"[^\w\s+#&.]")  # keeps C++, C#, AT&T, .NET
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(name: str) -> str:
+    """'  Apple,  Inc. ' -> 'apple inc'"""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub("", name.casefold())).strip()
+
+
+def exact_key(name: str) -> str:
+    """'  Apple,  Inc. ' -> 'apple inc.', 'C++' -> 'c++', '!!!' -> ''"""
+    return _SPACE_RE.sub(" ", _EXACT_PUNCT_RE.sub("", name.casefold())).strip()
+
+
+def ngrams(name: str, n: int = NGRAM_SIZE) -> List[str]:
+    padded = f"#{normalize(name)}#"
+    return [padded[i : i + n] for i in range(max(len(padded) - n + 1, 1))]
+
+
+class LexicalIndex:
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.exact_names: Dict[str, str] = {}  # exact key -> entity name
+        self.names: List[str] = []  # indexed names, including aliases
+        self.entity_names: List[str] = []  # the entity each indexed name is for
+        self.lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = collections.defaultdict(dict)
+        self.total_length = 0
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, entity_name: Optional[str] = None) -> None:
+        """
+        Indexes `name`, as an alias of `entity_name` if given. Names without an
+        exact key (only punctuation) are indexed for search but never exact.
+        """
+        key = exact_key(name)
+        if key in self.exact_names:
+            return
+        if key:
+            self.exact_names[key] = entity_name or name
+        doc_id = len(self.names)
+        grams = ngrams(name)
+        self.names.append(name)
+        self.entity_names.append(entity_name or name)
+        self.lengths.append(len(grams))
+        self.total_length += len(grams)
+        for gram, tf in collections.Counter(grams).items():
+            self.postings[gram][doc_id] = tf
+
+    def exact(self, name: str) -> Optional[str]:
+        """The entity named `name` up to case, spaces and most punctuation"""
+        key = exact_key(name)
+        return self.exact_names.get(key) if key else None
+
+    def retain(self, entity_names: Container[str]) -> "LexicalIndex":
+        """A new index of the names and aliases of `entity_names` only"""
+        index = LexicalIndex()
+        for name, entity_name in zip(self.names, self.entity_names):
+            if entity_name in entity_names:
+                index.add(name, entity_name)
+        return index
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        min_score: Optional[float] = None,
+        entity_names: Optional[Container[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Up to `k` entity names by BM25 over character trigrams of their names
+        and aliases, divided by the score the query would get against itself
+        so that 1.0 is an exact match. Only `entity_names` are scored if given.
+        """
+        if not self.names:
+            return []
+        min_score = DEFAULT_MIN_LEXICAL_SCORE if min_score is None else min_score
+        query_grams = collections.Counter(ngrams(query))
+        query_length = sum(query_grams.values())
+        avg_length = self.total_length / len(self.names)
+        scores: Dict[int, float] = collections.defaultdict(float)
+        best = 0.0
+        for gram, query_tf in query_grams.items():
+            idf = self._idf(gram)
+            best += idf * self._tf_weight(query_tf, query_length, avg_length)
+            for doc_id, tf in self.postings.get(gram, {}).items():
+                if (
+                    entity_names is not None
+                    and self.entity_names[doc_id] not in entity_names
+                ):
+                    continue
+                scores[doc_id] += idf * self._tf_weight(
+                    tf, self.lengths[doc_id], avg_length
+                )
+        if best <= 0:
+            return []
+        results: Dict[str, float] = {}
+        for doc_id, score in sorted(scores.items(), key=lambda i: i[1], reverse=True):
+            if len(results) == k or score / best < min_score:
+                break
+            results.setdefault(self.entity_names[doc_id], min(score / best, 1.0))
+        return list(results.items())
+
+    def _idf(self, gram: str) -> float:
+        df = len(self.postings.get(gram, ()))
+        return math.log(1 + (len(self.names) - df + 0.5) / (df + 0.5))
+
+    @staticmethod
+    def _tf_weight(tf: int, length: int, avg_length: float) -> float:
+        norm = 1 - BM25_B + BM25_B * length / avg_length
+        return tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+
+def reciprocal_rank_fusion(*rankings: List[str]) -> List[Tuple[str, float]]:
+    """Merges ranked lists of names, scoring each by sum(1 / (RRF_K + rank))"""
+    scores: Dict[str, float] = collections.defaultdict(float)
+    for ranking in rankings:
+        for rank, name in enumerate(ranking):
+            scores[name] += 1 / (RRF_K + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
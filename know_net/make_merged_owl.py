@@ -1,18 +1,99 @@
-from typing import List
+import hashlib
 import os
+import re
+import shutil
+from typing import Dict, Iterable, List, Optional, Set, TextIO
 
-from know_net.owl_maker import ONT
+from loguru import logger
 
+from know_net import turtle
+from know_net.ontology import ONT
 
-def main() -> None:
-    files = os.listdir("data")
-    turtles: List[str] = [ONT]
-    for file in files:
-        with open(f"data/{file}", "r") as f:
-            turtle = f.read()
-        turtles.append(turtle)
-    with open("ontology.owl", "w") as f:
-        f.write("\n".join(turtles))
+DATA_DIR = "data"
+OUTPUT_PATH = "ontology.owl"
+QUARANTINE_DIR = "data_quarantine"
+STATEMENT_DIGEST_SIZE = 16  # bytes per remembered statement
+
+
+class StatementSet:
+    """
+    Remembers which statements were already written by keeping a fixed-size
+    digest per statement instead of the statement itself.
+    """
+
+    def __init__(self) -> None:
+        self._digests: Set[bytes] = set()
+
+    def add(self, statement: turtle.Statement) -> bool:
+        """Returns True if the statement had not been seen before."""
+        digest = hashlib.blake2b(
+            "\x00".join(statement).encode(), digest_size=STATEMENT_DIGEST_SIZE
+        ).digest()
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+def main(
+    data_dir: str = DATA_DIR,
+    output_path: str = OUTPUT_PATH,
+    quarantine_dir: Optional[str] = QUARANTINE_DIR,
+) -> None:
+    prefixes, ont_statements = turtle.parse(ONT)
+    ont_statements = turtle.canonicalize_bnodes(ont_statements)
+    seen = StatementSet()
+    n_fragments = n_statements = 0
+    with open(output_path, "w") as out:
+        out.write(turtle.prefix_block(prefixes))
+        write_new_statements(out, ont_statements, seen, prefixes)
+        for i, file in enumerate(sorted(os.listdir(data_dir), key=natural_key)):
+            path = os.path.join(data_dir, file)
+            with open(path, "r") as f:
+                text = f.read()
+            try:
+                _, statements = turtle.parse(text, prefixes, bnode_prefix=f"f{i}_")
+                # identical restrictions etc. across fragments get equal labels
+                statements = turtle.canonicalize_bnodes(statements)
+            except turtle.TurtleSyntaxError as e:
+                logger.warning("skipping malformed fragment {}: {}", path, e)
+                if quarantine_dir is not None:
+                    quarantine(path, quarantine_dir)
+                continue
+            n_fragments += 1
+            n_statements += len(statements)
+            write_new_statements(out, statements, seen, prefixes)
+    logger.info(
+        "merged {} fragments: {} statements, {} unique",
+        n_fragments,
+        n_statements,
+        len(seen),
+    )
+
+
+def write_new_statements(
+    out: TextIO,
+    statements: Iterable[turtle.Statement],
+    seen: StatementSet,
+    prefixes: Dict[str, str],
+) -> None:
+    new_statements = [s for s in statements if seen.add(s)]
+    if new_statements:
+        out.write(turtle.to_turtle(new_statements, prefixes))
+        out.write("\n")
+
+
+def quarantine(path: str, quarantine_dir: str) -> None:
+    os.makedirs(quarantine_dir, exist_ok=True)
+    shutil.copy2(path, quarantine_dir)
+
+
+def natural_key(name: str) -> List:
+    """turtle_2 sorts before turtle_10"""
+    return [int(s) if s.isdigit() else s for s in re.split(r"(\d+)", name)]
 
 
 if __name__ == "__main__":
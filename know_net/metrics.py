@@ -0,0 +1,197 @@
+"""
+Lightweight pipeline metrics: counters, histograms and timed spans, exported as
+Prometheus text or JSON to a file or a local HTTP endpoint.
+
+Stages listed in the KNOW_NET_PROFILE environment variable (comma separated,
+e.g. "normalize_triples,graph_build") are additionally run under cProfile;
+`dump_profiles` writes one pstats file per stage.
+"""
+import bisect
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+from http import server
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+from loguru import logger
+
+PREFIX = "know_net_"
+PROFILE_STAGES_ENV = "KNOW_NET_PROFILE"
+DEFAULT_PROFILE_DIR = ".profiles"
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> List[int]:
+        cumulative, total = [], 0
+        for c in self.counts:
+            total += c
+            cumulative.append(total)
+        return cumulative
+
+
+class Registry:
+    def __init__(self, profile_stages: Optional[Set[str]] = None) -> None:
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.profilers: Dict[str, cProfile.Profile] = {}
+        self.profile_stages = profile_stages or set()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0.0) + value
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    def merge(self, data: Dict) -> None:
+        """Adds the counters and histograms of another registry's `to_dict`"""
+        with self._lock:
+            for name, value in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0.0) + value
+            for name, h in data["histograms"].items():
+                buckets = tuple(float(b) for b in h["buckets"])
+                histogram = self.histograms.setdefault(name, Histogram(buckets))
+                if histogram.buckets != buckets:
+                    raise ValueError(f"{name} has different buckets")
+                previous = 0
+                for i, cumulative in enumerate(h["buckets"].values()):
+                    histogram.counts[i] += cumulative - previous
+                    previous = cumulative
+                histogram.counts[-1] += h["count"] - previous  # +Inf
+                histogram.count += h["count"]
+                histogram.sum += h["sum"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Times the block into the `<stage>_seconds` histogram"""
+        profiler = self._start_profiler(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{stage}_seconds", time.perf_counter() - start)
+            if profiler is not None:
+                profiler.disable()
+
+    def _start_profiler(self, stage: str) -> Optional[cProfile.Profile]:
+        if stage not in self.profile_stages:
+            return None
+        profiler = self.profilers.setdefault(stage, cProfile.Profile())
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active
+            return None
+        return profiler
+
+    ## Exporting
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: {
+                        "count": h.count,
+                        "sum": h.sum,
+                        "buckets": dict(
+                            zip(map(str, h.buckets), h.cumulative_counts())
+                        ),
+                    }
+                    for name, h in self.histograms.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name} {value}")
+            for name, h in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                bounds = [str(b) for b in h.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, h.cumulative_counts()):
+                    lines.append(f'{PREFIX}{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{PREFIX}{name}_sum {h.sum}")
+                lines.append(f"{PREFIX}{name}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes JSON if `path` ends with .json, Prometheus text otherwise"""
+        if path.endswith(".json"):
+            text = json.dumps(self.to_dict(), indent=2)
+        else:
+            text = self.to_prometheus()
+        with open(path, "w") as f:
+            f.write(text)
+
+    def serve(self, port: int = DEFAULT_METRICS_PORT) -> server.ThreadingHTTPServer:
+        """Serves /metrics (Prometheus text) and /metrics.json on localhost"""
+        registry = self
+
+        class Handler(server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain"
+                elif self.path == "/metrics.json":
+                    body, content_type = (
+                        json.dumps(registry.to_dict()),
+                        "application/json",
+                    )
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args) -> None:
+                pass
+
+        httpd = server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        logger.info("serving metrics on http://127.0.0.1:{}/metrics", port)
+        return httpd
+
+    def dump_profiles(self, output_dir: str = DEFAULT_PROFILE_DIR) -> None:
+        os.makedirs(output_dir, exist_ok=True)
+        for stage, profiler in self.profilers.items():
+            profiler.dump_stats(os.path.join(output_dir, f"{stage}.prof"))
+
+
+def get_profile_stages() -> Set[str]:
+    stages = os.environ.get(PROFILE_STAGES_ENV, "")
+    return {s.strip() for s in stages.split(",") if s.strip()}
+
+
+REGISTRY = Registry(get_profile_stages())
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+span = REGISTRY.span
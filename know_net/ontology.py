@@ -0,0 +1,207 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from know_net import turtle
+
+OWL_CLASS = "<http://www.w3.org/2002/07/owl#Class>"
+RDFS_SUBCLASS_OF = "<http://www.w3.org/2000/01/rdf-schema#subClassOf>"
+RDFS_LABEL = "<http://www.w3.org/2000/01/rdf-schema#label>"
+
+ONT = """@prefix : <http://www.semanticweb.org/ontologies/technology#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+: a owl:Ontology .
+
+:Technology a owl:Class .
+
+:Hardware a owl:Class ;
+    rdfs:subClassOf :Technology .
+
+:Software a owl:Class ;
+    rdfs:subClassOf :Technology .
+
+:AI a owl:Class ;
+    rdfs:subClassOf :Software .
+
+:MachineLearning a owl:Class ;
+    rdfs:subClassOf :AI .
+
+:DeepLearning a owl:Class ;
+    rdfs:subClassOf :MachineLearning .
+
+:Robotics a owl:Class ;
+    rdfs:subClassOf :Hardware .
+
+:Drone a owl:Class ;
+    rdfs:subClassOf :Robotics .
+
+:Computer a owl:Class ;
+    rdfs:subClassOf :Hardware .
+
+:Smartphone a owl:Class ;
+    rdfs:subClassOf :Hardware .
+
+:OperatingSystem a owl:Class ;
+    rdfs:subClassOf :Software .
+
+:Linux a owl:Class ;
+    rdfs:subClassOf :OperatingSystem .
+
+:Windows a owl:Class ;
+    rdfs:subClassOf :OperatingSystem .
+
+:MacOS a owl:Class ;
+    rdfs:subClassOf :OperatingSystem .
+
+:Android a owl:Class ;
+    rdfs:subClassOf :OperatingSystem .
+
+:iOS a owl:Class ;
+    rdfs:subClassOf :OperatingSystem .
+
+:Person a owl:Class .
+
+:Developer a owl:Class ;
+    rdfs:subClassOf :Person .
+
+:Researcher a owl:Class ;
+    rdfs:subClassOf :Person .
+
+:CEO a owl:Class ;
+    rdfs:subClassOf :Person .
+
+:Company a owl:Class .
+
+:Startup a owl:Class ;
+    rdfs:subClassOf :Company .
+
+:Multinational a owl:Class ;
+    rdfs:subClassOf :Company .
+
+:Innovation a owl:Class .
+
+:Patent a owl:Class ;
+    rdfs:subClassOf :Innovation .
+
+:ResearchPaper a owl:Class ;
+    rdfs:subClassOf :Innovation .
+
+:News a owl:Class .
+
+:BlogPost a owl:Class ;
+    rdfs:subClassOf :News .
+
+:PressRelease a owl:Class ;
+    rdfs:subClassOf :News .
+
+:Conference a owl:Class .
+
+:Webinar a owl:Class ;
+    rdfs:subClassOf :Conference .
+
+:Seminar a owl:Class ;
+    rdfs:subClassOf :Conference .
+
+:Product a owl:Class .
+
+:SoftwareProduct a owl:Class ;
+    rdfs:subClassOf :Product .
+
+:HardwareProduct a owl:Class ;
+    rdfs:subClassOf :Product .
+
+:Service a owl:Class .
+
+:CloudService a owl:Class ;
+    rdfs:subClassOf :Service .
+
+:ConsultingService a owl:Class ;
+    rdfs:subClassOf :Service .
+
+:Investment a owl:Class .
+
+:VentureCapital a owl:Class ;
+    rdfs:subClassOf :Investment .
+
+:Acquisition a owl:Class ;
+    rdfs:subClassOf :Investment .
+
+:Regulation a owl:Class .
+
+:PrivacyPolicy a owl:Class ;
+    rdfs:subClassOf :Regulation .
+
+:DataProtection a owl:Class ;
+    rdfs:subClassOf :Regulation .
+
+:worksFor a owl:ObjectProperty ;
+    rdfs:domain :Person ;
+    rdfs:range :Company .
+
+:develops a owl:ObjectProperty ;
+    rdfs:domain :Developer ;
+    rdfs:range :Product .
+
+:investsIn a owl:ObjectProperty ;
+    rdfs:domain :VentureCapital ;
+    rdfs:range :Startup .
+
+:publishes a owl:ObjectProperty ;
+    rdfs:domain :Researcher ;
+    rdfs:range :ResearchPaper .
+
+:attends a owl:ObjectProperty ;
+    rdfs:domain :Person ;
+    rdfs:range :Conference .
+
+:owns a owl:ObjectProperty ;
+    rdfs:domain :Company ;
+    rdfs:range :Product .
+
+:regulates a owl:ObjectProperty ;
+    rdfs:domain :Regulation ;
+    rdfs:range :Company .
+"""
+
+
+class OntologyClass(NamedTuple):
+    name: str
+    label: str
+    parent: Optional[str]
+
+
+def load_ontology_classes(ontology: str = ONT) -> List[OntologyClass]:
+    """
+    Read the owl:Class declarations of a Turtle ontology, keeping the first
+    declared superclass of each class.
+    """
+    _, statements = turtle.parse(ontology)
+    names: Dict[str, str] = {}
+    labels: Dict[str, str] = {}
+    parents: Dict[str, str] = {}
+    for s, p, o in statements:
+        if p == turtle.RDF_TYPE and o == OWL_CLASS and s.startswith("<"):
+            names.setdefault(s, local_name(s))
+        elif p == RDFS_SUBCLASS_OF and o.startswith("<"):
+            parents.setdefault(s, o)
+        elif p == RDFS_LABEL and o.startswith('"'):
+            labels.setdefault(s, o[1 : o.rindex('"')])
+    return [
+        OntologyClass(
+            name=name,
+            label=labels.get(iri, humanize(name)),
+            parent=names.get(parents.get(iri, "")),
+        )
+        for iri, name in names.items()
+    ]
+
+
+def local_name(iri_term: str) -> str:
+    return re.split(r"[#/]", iri_term[1:-1])[-1]
+
+
+def humanize(name: str) -> str:
+    """MachineLearning -> Machine Learning"""
+    return re.sub(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", " ", name)
@@ -0,0 +1,411 @@
+"""
+Minimal streaming-friendly Turtle reader/writer.
+
+Terms are kept in their N-Triples form (``<iri>``, ``_:label``, ``"lit"^^<dt>``)
+so statements can be hashed, compared and re-serialized without an RDF library.
+"""
+import hashlib
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = f"<{RDF}type>"
+RDF_FIRST = f"<{RDF}first>"
+RDF_REST = f"<{RDF}rest>"
+RDF_NIL = f"<{RDF}nil>"
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+|\#[^\n]*)
+    |(?P<iri><[^<>"{}|^`\\\s]*>)
+    |(?P<string>\"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"
+        |'''(?:[^'\\]|\\.|'(?!''))*'''
+        |"(?:[^"\\\n]|\\.)*"
+        |'(?:[^'\\\n]|\\.)*')
+    |(?P<directive>@prefix\b|@base\b)
+    |(?P<langtag>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+    |(?P<datatype>\^\^)
+    |(?P<bnode>_:[\w-]+(?:[\w.-]*[\w-])?)
+    |(?P<pname>(?:[A-Za-z][\w.-]*[\w-]|[A-Za-z])?:(?:[\w:%-](?:[\w.:%-]*[\w:%-])?)?)
+    |(?P<number>[+-]?(?:\d*\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+))
+    |(?P<word>[A-Za-z]+)
+    |(?P<punct>[.;,\[\]()])
+    """,
+    re.VERBOSE,
+)
+_ESCAPES = {
+    "t": "\t",
+    "b": "\b",
+    "n": "\n",
+    "r": "\r",
+    "f": "\f",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+}
+_ESCAPE_RE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.DOTALL)
+_LOCAL_NAME_RE = re.compile(r"^(?:[A-Za-z0-9_](?:[\w.-]*[\w-])?)?$")
+
+
+class TurtleSyntaxError(ValueError):
+    pass
+
+
+class Statement(NamedTuple):
+    subject: str
+    predicate: str
+    object_: str
+
+
+class _Token(NamedTuple):
+    kind: str
+    value: str
+    pos: int
+
+
+def tokenize(text: str) -> Iterator[_Token]:
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise TurtleSyntaxError(f"unexpected character {text[pos]!r} at {pos}")
+        kind = match.lastgroup or ""
+        if kind != "ws":
+            yield _Token(kind, match.group(), pos)
+        pos = match.end()
+
+
+def parse(
+    text: str,
+    prefixes: Optional[Dict[str, str]] = None,
+    bnode_prefix: str = "",
+) -> Tuple[Dict[str, str], List[Statement]]:
+    """
+    Parse a Turtle document into statements. ``prefixes`` seeds the namespace
+    map (useful for fragments that were written to be appended to another
+    document) and ``bnode_prefix`` keeps blank node labels unique across files.
+    Explicit labels become ``_:<bnode_prefix>b_<label>`` and generated ones
+    (``[]`` and collections) ``_:<bnode_prefix>genid<n>``.
+    """
+    parser = _Parser(text, dict(prefixes or {}), bnode_prefix)
+    return parser.prefixes, parser.parse()
+
+
+class _Parser:
+    def __init__(self, text: str, prefixes: Dict[str, str], bnode_prefix: str):
+        self.tokens = list(tokenize(text))
+        self.i = 0
+        self.prefixes = prefixes
+        self.base = ""
+        self.bnode_prefix = bnode_prefix
+        self.bnode_count = 0
+        self.statements: List[Statement] = []
+
+    def parse(self) -> List[Statement]:
+        while self.peek() is not None:
+            self.statement()
+        return self.statements
+
+    ## token helpers
+    def peek(self) -> Optional[_Token]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def next(self) -> _Token:
+        token = self.peek()
+        if token is None:
+            raise TurtleSyntaxError("unexpected end of document")
+        self.i += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        token = self.next()
+        if token.value != value:
+            raise TurtleSyntaxError(f"expected {value!r} at {token.pos}")
+
+    def at(self, value: str) -> bool:
+        token = self.peek()
+        return token is not None and token.kind == "punct" and token.value == value
+
+    ## grammar
+    def statement(self) -> None:
+        token = _require(self.peek())
+        if token.kind == "directive" or (
+            token.kind == "word" and token.value.upper() in ("PREFIX", "BASE")
+        ):
+            self.directive()
+            return
+        if self.at("["):
+            subject = self.blank_node_property_list()
+            if not self.at("."):
+                self.predicate_object_list(subject)
+        else:
+            subject = self.subject()
+            self.predicate_object_list(subject)
+        self.expect(".")
+
+    def directive(self) -> None:
+        token = self.next()
+        keyword = token.value.lstrip("@").lower()
+        if keyword == "prefix":
+            name = self.next()
+            if name.kind != "pname" or not name.value.endswith(":"):
+                raise TurtleSyntaxError(f"bad prefix name at {name.pos}")
+            self.prefixes[name.value[:-1]] = self.iri(self.next())[1:-1]
+        elif keyword == "base":
+            self.base = self.iri(self.next())[1:-1]
+        else:
+            raise TurtleSyntaxError(f"unknown directive at {token.pos}")
+        if token.kind == "directive":
+            self.expect(".")
+
+    def subject(self) -> str:
+        token = self.next()
+        if token.kind == "bnode":
+            return self.bnode_label(token.value[2:])
+        if token.value == "(":
+            return self.collection()
+        return self.iri(token)
+
+    def predicate_object_list(self, subject: str) -> None:
+        while True:
+            predicate = self.verb()
+            self.statements.append(Statement(subject, predicate, self.object_()))
+            while self.at(","):
+                self.next()
+                self.statements.append(Statement(subject, predicate, self.object_()))
+            if not self.at(";"):
+                return
+            while self.at(";"):
+                self.next()
+            if self.at(".") or self.at("]"):
+                return
+
+    def verb(self) -> str:
+        token = self.next()
+        if token.kind == "word" and token.value == "a":
+            return RDF_TYPE
+        return self.iri(token)
+
+    def object_(self) -> str:
+        token = _require(self.peek())
+        if token.kind == "string":
+            return self.literal()
+        if token.kind == "number":
+            self.next()
+            return number_literal(token.value)
+        if token.kind == "word" and token.value in ("true", "false"):
+            self.next()
+            return f'"{token.value}"^^<{XSD}boolean>'
+        if self.at("["):
+            return self.blank_node_property_list()
+        return self.subject()
+
+    def literal(self) -> str:
+        token = self.next()
+        quote = 3 if token.value[:3] in ('"""', "'''") else 1
+        lexical = escape_literal(unescape(token.value[quote:-quote]))
+        following = self.peek()
+        if following is not None and following.kind == "langtag":
+            self.next()
+            return f'"{lexical}"{following.value.lower()}'
+        if following is not None and following.kind == "datatype":
+            self.next()
+            return f'"{lexical}"^^{self.iri(self.next())}'
+        return f'"{lexical}"'
+
+    def blank_node_property_list(self) -> str:
+        self.expect("[")
+        node = self.fresh_bnode()
+        if not self.at("]"):
+            self.predicate_object_list(node)
+        self.expect("]")
+        return node
+
+    def collection(self) -> str:
+        items: List[str] = []
+        while not self.at(")"):
+            items.append(self.object_())
+        self.next()
+        head = RDF_NIL
+        for item in reversed(items):
+            node = self.fresh_bnode()
+            self.statements.append(Statement(node, RDF_FIRST, item))
+            self.statements.append(Statement(node, RDF_REST, head))
+            head = node
+        return head
+
+    def iri(self, token: _Token) -> str:
+        if token.kind == "iri":
+            return f"<{urljoin(self.base, token.value[1:-1])}>"
+        if token.kind == "pname":
+            prefix, _, local = token.value.partition(":")
+            if prefix not in self.prefixes:
+                raise TurtleSyntaxError(f"undeclared prefix {prefix!r} at {token.pos}")
+            return f"<{self.prefixes[prefix]}{local}>"
+        raise TurtleSyntaxError(f"expected IRI at {token.pos}, got {token.value!r}")
+
+    def bnode_label(self, label: str) -> str:
+        # "b_" keeps explicit labels apart from the generated "genid" ones
+        return f"_:{self.bnode_prefix}b_{label}"
+
+    def fresh_bnode(self) -> str:
+        self.bnode_count += 1
+        return f"_:{self.bnode_prefix}genid{self.bnode_count}"
+
+
+def _require(token: Optional[_Token]) -> _Token:
+    if token is None:
+        raise TurtleSyntaxError("unexpected end of document")
+    return token
+
+
+def unescape(value: str) -> str:
+    def replace(match: "re.Match[str]") -> str:
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        char = match.group(3)
+        if char not in _ESCAPES:
+            raise TurtleSyntaxError(f"bad escape sequence \\{char}")
+        return _ESCAPES[char]
+
+    return _ESCAPE_RE.sub(replace, value)
+
+
+def escape_literal(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def number_literal(value: str) -> str:
+    if "e" in value.lower():
+        datatype = "double"
+    elif "." in value:
+        datatype = "decimal"
+    else:
+        datatype = "integer"
+    return f'"{value}"^^<{XSD}{datatype}>'
+
+
+## Blank nodes
+
+
+def canonicalize_bnodes(statements: List[Statement]) -> List[Statement]:
+    """
+    Relabel tree-shaped blank nodes (those used as object at most once, like
+    the ones ``[...]`` and collections produce) after their content and the
+    statement that points to them, so the same restriction written in two
+    documents gets the same label. Other blank nodes keep their labels.
+    """
+    outgoing: Dict[str, List[Tuple[str, str]]] = {}
+    incoming: Dict[str, List[Tuple[str, str]]] = {}
+    for s, p, o in statements:
+        if s.startswith("_:"):
+            outgoing.setdefault(s, []).append((p, o))
+        if o.startswith("_:"):
+            incoming.setdefault(o, []).append((s, p))
+    opaque = {b for b, parents in incoming.items() if len(parents) > 1}
+    contents: Dict[str, str] = {}
+
+    def content(node: str, visiting: Set[str]) -> str:
+        if node in opaque or not node.startswith("_:"):
+            return node
+        if node not in contents:
+            if node in visiting:  # a cycle, keep its members as they are
+                opaque.update(visiting)
+                return node
+            visiting.add(node)
+            lines = sorted(
+                f"{p} {content(o, visiting)}" for p, o in outgoing.get(node, [])
+            )
+            visiting.discard(node)
+            if node in opaque:
+                return node
+            contents[node] = _digest("\n".join(lines))
+        return contents[node]
+
+    labels: Dict[str, str] = {}
+
+    def label(node: str) -> str:
+        if node in opaque or not node.startswith("_:"):
+            return node
+        if node not in labels:
+            parents = incoming.get(node)
+            anchor = "" if not parents else f"{label(parents[0][0])} {parents[0][1]}"
+            labels[node] = f"_:c{_digest(anchor + chr(0) + content(node, set()))}"
+        return labels[node]
+
+    for node in set(outgoing) | set(incoming):
+        content(node, set())
+    return [Statement(label(s), p, label(o)) for s, p, o in statements]
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+## Writing
+
+
+def iri_term(iri: str) -> str:
+    return f"<{iri}>"
+
+
+def to_ntriples(statement: Statement) -> str:
+    return f"{statement.subject} {statement.predicate} {statement.object_} .\n"
+
+
+def prefix_block(prefixes: Dict[str, str]) -> str:
+    lines = (f"@prefix {name}: <{ns}> ." for name, ns in sorted(prefixes.items()))
+    return "\n".join(lines) + "\n\n"
+
+
+def compact(term: str, prefixes: Dict[str, str]) -> str:
+    """
+    Shorten an N-Triples term with the longest matching prefix, if it yields a
+    valid prefixed name.
+    """
+    if term.startswith('"'):
+        lexical, sep, datatype = term.rpartition("^^")
+        if sep and datatype.startswith("<"):
+            return f"{lexical}^^{compact(datatype, prefixes)}"
+        return term
+    if not term.startswith("<"):
+        return term
+    iri = term[1:-1]
+    best: Optional[Tuple[str, str]] = None
+    for name, ns in prefixes.items():
+        if iri.startswith(ns) and (best is None or len(ns) > len(best[1])):
+            best = (name, ns)
+    if best is not None:
+        local = iri[len(best[1]) :]
+        if _LOCAL_NAME_RE.match(local):
+            return f"{best[0]}:{local}"
+    return term
+
+
+def to_turtle(statements: Iterable[Statement], prefixes: Dict[str, str]) -> str:
+    """
+    Serialize statements as Turtle, grouping consecutive statements on the same
+    subject (and predicate) with ``;`` and ``,``.
+    """
+    by_subject: Dict[str, Dict[str, List[str]]] = {}
+    for s, p, o in statements:
+        by_subject.setdefault(s, {}).setdefault(p, []).append(o)
+
+    blocks: List[str] = []
+    for subject, predicates in by_subject.items():
+        lines: List[str] = []
+        for predicate, objects in predicates.items():
+            verb = "a" if predicate == RDF_TYPE else compact(predicate, prefixes)
+            objs = " , ".join(compact(o, prefixes) for o in objects)
+            lines.append(f"{verb} {objs}")
+        body = " ;\n    ".join(lines)
+        blocks.append(f"{compact(subject, prefixes)} {body} .\n")
+    return "\n".join(blocks)
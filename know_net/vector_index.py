@@ -0,0 +1,188 @@
+import math
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+from loguru import logger
+
+DEFAULT_INDEX_TYPE = "flat"  # one of "flat", "ivf", "hnsw"
+DEFAULT_METRIC = "cosine"  # one of "cosine", "l2"
+DEFAULT_IVF_TRAIN_SIZE = 10_000
+DEFAULT_IVF_NLIST = 256
+DEFAULT_IVF_NPROBE = 16
+DEFAULT_HNSW_M = 32
+DEFAULT_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_HNSW_EF_SEARCH = 64
+EXACT_SEARCH_MAX_IDS = 1_000  # smaller id selections are scored exhaustively
+
+
+class IndexConfig(NamedTuple):
+    index_type: str = DEFAULT_INDEX_TYPE
+    metric: str = DEFAULT_METRIC
+    n_shards: int = 1
+    ivf_train_size: int = DEFAULT_IVF_TRAIN_SIZE
+    ivf_nlist: int = DEFAULT_IVF_NLIST
+    ivf_nprobe: int = DEFAULT_IVF_NPROBE
+    hnsw_m: int = DEFAULT_HNSW_M
+    hnsw_ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION
+    hnsw_ef_search: int = DEFAULT_HNSW_EF_SEARCH
+
+
+class VectorIndex:
+    """
+    Drop-in replacement for the faiss index behind langchain's FAISS store.
+
+    Vectors get sequential ids and are spread round-robin over `n_shards`
+    sub-indexes that are searched in parallel. With the "cosine" metric vectors
+    are L2-normalized so scores are cosine similarities. An "ivf" index serves
+    searches from an exhaustive buffer until `ivf_train_size` vectors have been
+    added, then trains on them and moves them over.
+    """
+
+    def __init__(self, dim: int, config: Optional[IndexConfig] = None) -> None:
+        self.d = dim
+        self.config = config or IndexConfig()
+        if self.config.metric == "cosine":
+            self.metric_type = faiss.METRIC_INNER_PRODUCT
+        elif self.config.metric == "l2":
+            self.metric_type = faiss.METRIC_L2
+        else:
+            raise ValueError(f"Unknown metric: {self.config.metric}")
+        if self.config.index_type not in ("flat", "ivf", "hnsw"):
+            raise ValueError(f"Unknown index type: {self.config.index_type}")
+
+        self.ntotal = 0
+        self.is_trained = self.config.index_type != "ivf"
+        self.buffer: Optional[faiss.Index] = None
+        self.shards: List[faiss.Index] = []
+        if self.is_trained:
+            self.shards = [self._make_shard() for _ in range(self.config.n_shards)]
+        else:
+            self.buffer = faiss.IndexFlat(dim, self.metric_type)
+        self._searcher: Optional[faiss.IndexShards] = None
+
+    def add(self, x: np.ndarray) -> None:
+        x = self._prepare(x)
+        if self.buffer is not None:
+            self.buffer.add(x)
+            self.ntotal += len(x)
+            if self.ntotal >= self.config.ivf_train_size:
+                self._train_from_buffer()
+            return
+        self._add_to_shards(x, np.arange(self.ntotal, self.ntotal + len(x)))
+        self.ntotal += len(x)
+
+    def search(
+        self, x: np.ndarray, k: int, ids: Optional[Sequence[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Searches all vectors, or only those with the given `ids`"""
+        x = self._prepare(x)
+        if ids is not None:
+            return self._search_ids(x, k, ids)
+        if self.buffer is not None:
+            return self.buffer.search(x, k)
+        if len(self.shards) == 1:
+            return self.shards[0].search(x, k)
+        if self._searcher is None:
+            self._searcher = faiss.IndexShards(self.d, True, False)
+            for shard in self.shards:
+                self._searcher.add_shard(shard)
+        self._searcher.syncWithSubIndexes()
+        return self._searcher.search(x, k)
+
+    def _search_ids(
+        self, x: np.ndarray, k: int, ids: Union[Sequence[int], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Filters inside the faiss search instead of reconstructing the vectors.
+        As the selection gets smaller, ivf probes proportionally more lists so
+        that about as many vectors are scanned as in an unfiltered search.
+        HNSW cannot route through a small selection, those are scored exactly.
+        """
+        c = self.config
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.buffer is None and c.index_type != "flat":
+            if len(ids) <= EXACT_SEARCH_MAX_IDS:
+                vectors = np.stack([self.reconstruct(int(i)) for i in ids])
+                flat = faiss.IndexFlat(self.d, self.metric_type)
+                flat.add(vectors)
+                distances, rows = flat.search(x, k)
+                return distances, np.where(rows == -1, -1, ids[rows])
+        selector = faiss.IDSelectorBatch(ids)
+        if self.buffer is not None or c.index_type == "flat":
+            params = faiss.SearchParameters(sel=selector)
+        elif c.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=c.hnsw_ef_search)
+        else:
+            ratio = self.ntotal / max(len(ids), 1)
+            nprobe = min(c.ivf_nlist, math.ceil(c.ivf_nprobe * ratio))
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+        if self.buffer is not None:
+            return self.buffer.search(x, k, params=params)
+        results = [shard.search(x, k, params=params) for shard in self.shards]
+        if len(results) == 1:
+            return results[0]
+        distances = np.hstack([d for d, _ in results])
+        labels = np.hstack([i for _, i in results])
+        if self.metric_type == faiss.METRIC_INNER_PRODUCT:
+            order = np.argsort(-distances, axis=1, kind="stable")[:, :k]
+        else:
+            order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        return (
+            np.take_along_axis(distances, order, axis=1),
+            np.take_along_axis(labels, order, axis=1),
+        )
+
+    def reconstruct(self, i: int) -> np.ndarray:
+        if self.buffer is not None:
+            return self.buffer.reconstruct(i)
+        return self.shards[i % len(self.shards)].reconstruct(i)
+
+    def _prepare(self, x: np.ndarray) -> np.ndarray:
+        x = np.array(x, dtype=np.float32)  # copy, normalization is in-place
+        if self.config.metric == "cosine":
+            faiss.normalize_L2(x)
+        return x
+
+    def _make_shard(self) -> faiss.Index:
+        c = self.config
+        if c.index_type == "flat":
+            index = faiss.IndexFlat(self.d, self.metric_type)
+        elif c.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self.d, c.hnsw_m, self.metric_type)
+            index.hnsw.efConstruction = c.hnsw_ef_construction
+            index.hnsw.efSearch = c.hnsw_ef_search
+        else:
+            quantizer = faiss.IndexFlat(self.d, self.metric_type)
+            index = faiss.IndexIVFFlat(quantizer, self.d, c.ivf_nlist, self.metric_type)
+            index.nprobe = c.ivf_nprobe
+        return faiss.IndexIDMap2(index)
+
+    def _add_to_shards(self, x: np.ndarray, ids: np.ndarray) -> None:
+        n_shards = len(self.shards)
+        for i, shard in enumerate(self.shards):
+            mask = ids % n_shards == i
+            if mask.any():
+                shard.add_with_ids(x[mask], ids[mask])
+
+    def _train_from_buffer(self) -> None:
+        assert self.buffer is not None
+        vectors = self.buffer.reconstruct_n(0, self.buffer.ntotal)
+        logger.info("training ivf index on {} vectors", len(vectors))
+        self.shards = [self._make_shard() for _ in range(self.config.n_shards)]
+        for shard in self.shards:
+            shard.train(vectors)
+            faiss.extract_index_ivf(shard).make_direct_map()
+        self._add_to_shards(vectors, np.arange(len(vectors)))
+        self.buffer = None
+        self.is_trained = True
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_searcher"] = None  # IndexShards cannot be serialized
+        return state
+
+
+def cosine_relevance_score(score: float) -> float:
+    """Inner product of normalized vectors already is the cosine similarity"""
+    return score
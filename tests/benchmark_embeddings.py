@@ -0,0 +1,107 @@
+"""
+CPU embedding throughput of the default sentence-transformers model.
+
+    python tests/benchmark_embeddings.py --texts 1024
+
+Reports embeddings per second when calling the model directly at different
+batch sizes (fp32 and int8 quantized), and when many single-text callers go
+through BatchingEmbeddings, the way concurrent lookups hit the embedder.
+
+Without access to the HuggingFace hub, `--stand-in` runs the same
+architecture (all-mpnet-base-v2, MPNet base) with random weights on hashed
+token ids; throughput does not depend on the weights.
+"""
+import argparse
+import time
+import zlib
+from concurrent import futures
+from typing import List
+
+import torch
+import transformers
+from langchain.embeddings import base as embeddings_base
+
+from know_net import embedding_service
+
+BATCH_SIZES = (1, 8, 32, 128)
+N_CALLERS = 32
+
+
+def stand_in_entity_names(n: int) -> List[str]:
+    words = "Apple Tesla SEC iPhone Nvidia chip AI model CEO startup deal Fed".split()
+    return [
+        f"{words[i % len(words)]} {words[(i * 7) % len(words)]} {i}" for i in range(n)
+    ]
+
+
+class StandInEmbeddings(embeddings_base.Embeddings):
+    def __init__(self, quantize: bool) -> None:
+        model = transformers.MPNetModel(transformers.MPNetConfig()).eval()
+        self.model = embedding_service.quantize_int8(model) if quantize else model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # about two word pieces per word, plus <s> and </s>
+        ids = [
+            [0]
+            + [
+                5 + zlib.crc32(f"{w}{i}".encode()) % 30000
+                for w in t.split()
+                for i in (0, 1)
+            ]
+            + [2]
+            for t in texts
+        ]
+        length = max(map(len, ids))
+        input_ids = torch.tensor([x + [1] * (length - len(x)) for x in ids])
+        mask = (input_ids != 1).long()
+        with torch.inference_mode():
+            hidden = self.model(input_ids=input_ids, attention_mask=mask)[0]
+        pooled = (hidden * mask[..., None]).sum(1) / mask.sum(1, keepdim=True)
+        return pooled.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def rate(embedder: embeddings_base.Embeddings, texts: List[str], batch: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        embedder.embed_documents(texts[i : i + batch])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def batching_rate(embedder: embeddings_base.Embeddings, texts: List[str]) -> float:
+    service = embedding_service.BatchingEmbeddings(embedder)
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(N_CALLERS) as pool:
+        list(pool.map(service.embed_query, texts))
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=1024)
+    parser.add_argument("--stand-in", action="store_true")
+    args = parser.parse_args()
+    texts = stand_in_entity_names(args.texts)
+
+    for quantize in (False, True):
+        embedder: embeddings_base.Embeddings
+        if args.stand_in:
+            embedder = StandInEmbeddings(quantize)
+        else:
+            embedder = embedding_service.get_huggingface_embedder(
+                device="cpu", quantize=quantize
+            )
+        embedder.embed_documents(texts[:8])  # warm up
+        name = "int8" if quantize else "fp32"
+        for batch in BATCH_SIZES:
+            print(f"{name} batch={batch:<4} {rate(embedder, texts, batch):8.1f} emb/s")
+        print(
+            f"{name} batching service, {N_CALLERS} single-text callers "
+            f"{batching_rate(embedder, texts):8.1f} emb/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Recall vs. latency of the entity vector index settings on stand-in embeddings.
+
+    python tests/benchmark_vector_index.py --n 1000000 --dim 768
+
+Vectors and queries are drawn around shared random cluster centers with a low
+intrinsic dimension to mimic sentence embeddings. Queries are issued one at a time the way
+`LLMGraphBuilder._normalize_triple` does, and recall@1 is measured against an
+exact flat search.
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from know_net import vector_index
+
+CONFIGS: List[Tuple[str, vector_index.IndexConfig]] = [
+    ("flat", vector_index.IndexConfig()),
+    ("flat x4", vector_index.IndexConfig(n_shards=4)),
+    ("ivf nprobe=4", vector_index.IndexConfig(index_type="ivf", ivf_nprobe=4)),
+    ("ivf nprobe=16", vector_index.IndexConfig(index_type="ivf", ivf_nprobe=16)),
+    ("ivf nprobe=16 x4", vector_index.IndexConfig(index_type="ivf", n_shards=4)),
+    ("hnsw ef=32", vector_index.IndexConfig(index_type="hnsw", hnsw_ef_search=32)),
+    ("hnsw ef=128", vector_index.IndexConfig(index_type="hnsw", hnsw_ef_search=128)),
+]
+
+
+def stand_in_embeddings(
+    n: int, n_queries: int, dim: int, intrinsic_dim: int = 32, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 1000, 1), dim), dtype=np.float32)
+    basis = rng.standard_normal((intrinsic_dim, dim), dtype=np.float32)
+
+    def sample(size: int) -> np.ndarray:
+        assignment = rng.integers(0, len(centers), size)
+        noise = rng.standard_normal((size, intrinsic_dim), dtype=np.float32)
+        return centers[assignment] + 0.5 * noise @ basis
+
+    return sample(n), sample(n_queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=1_000, help="add batch size")
+    args = parser.parse_args()
+
+    vectors, queries = stand_in_embeddings(args.n, args.queries, args.dim)
+
+    truth = None
+    print(f"n={args.n} dim={args.dim} queries={args.queries}")
+    print(f"{'index':<20}{'build s':>10}{'query ms':>10}{'recall@1':>10}")
+    for name, config in CONFIGS:
+        index = vector_index.VectorIndex(args.dim, config)
+        start = time.perf_counter()
+        for i in range(0, args.n, args.batch):
+            index.add(vectors[i : i + args.batch])
+        build_s = time.perf_counter() - start
+
+        found = np.empty(args.queries, dtype=np.int64)
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            _, ids = index.search(query[None, :], 1)
+            found[i] = ids[0, 0]
+        query_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        if truth is None:  # the first config is the exact baseline
+            truth = found
+        recall = float(np.mean(found == truth))
+        print(f"{name:<20}{build_s:>10.2f}{query_ms:>10.3f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
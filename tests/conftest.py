@@ -0,0 +1,40 @@
+import hashlib
+from typing import List
+
+import numpy as np
+import pytest
+from langchain.embeddings import base as embeddings_base
+
+STUB_DIM = 64
+
+
+class StubEmbeddings(embeddings_base.Embeddings):
+    """Hashed character trigrams, deterministic and without a model"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(STUB_DIM)
+        padded = f"#{text.casefold()}#"
+        for i in range(len(padded) - 2):
+            digest = hashlib.md5(padded[i : i + 3].encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % STUB_DIM] += 1
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+
+@pytest.fixture
+def make_builder(tmp_path, monkeypatch):
+    """LLMGraphBuilder factory with a stub embedder and no llm calls"""
+    from langchain.llms.fake import FakeListLLM
+
+    from know_net import graph_building
+
+    monkeypatch.chdir(tmp_path)  # the llm cache is written to the cwd
+
+    def make(**kwargs) -> graph_building.LLMGraphBuilder:
+        kwargs.setdefault("llm", FakeListLLM(responses=[""]))
+        kwargs.setdefault("embedding_model", StubEmbeddings())
+        return graph_building.LLMGraphBuilder(**kwargs)
+
+    return make
@@ -1,4 +1,10 @@
-from know_net.graph_building import LLMGraphBuilder
+import time
+
+import numpy as np
+import pytest
+
+from know_net import base, graph_building, metrics, vector_index
+from know_net.graph_building import KGTriple, LLMGraphBuilder
 
 test_doc1 = """"New Breakthrough in Renewable Energy: Solar-Powered Artificial Leaves Set to Revolutionize Clean Energy Production"
 
@@ -12,6 +18,156 @@ Unlike traditional solar panels, which convert sunlight directly into electricit
 """
 test_doc2 = """nThe new iPhone 12 is expected to be released in September 2020. It will have a 5G network, improved camera, and a new design."""
 
+
+def add_entities(builder, names, type_names=None, timestamp=0.0):
+    """Adds `names` as entities, each in a triple with the next one"""
+    type_names = type_names or [None] * len(names)
+    vectors = np.array(builder.embeddings.embed_documents(names), dtype=np.float32)
+    triples = [(s, "rel", o, "url", timestamp) for s, o in zip(names, names[1:])]
+    shard = graph_building.BuilderShard(names, type_names, vectors, triples)
+    builder.merge_shard(shard)
+
+
+def test_search_entities_exact_hit_first(make_builder):
+    builder = make_builder()
+    add_entities(builder, ["C", "C#", "C++"])
+    for name in ["C", "C#", "C++"]:
+        results = builder.search_entities(name.lower(), k=1)
+        assert [(e.name, score) for e, score in results] == [(name, 1.0)]
+    results = builder.search_entities("C++")
+    assert [e.name for e, _ in results][0] == "C++"
+    assert sorted(e.name for e, _ in results) == ["C", "C#", "C++"]
+
+
+@pytest.mark.parametrize(
+    "index_config",
+    [
+        vector_index.IndexConfig(),
+        vector_index.IndexConfig(index_type="ivf", ivf_train_size=32, ivf_nlist=4),
+        vector_index.IndexConfig(index_type="hnsw", n_shards=2),
+    ],
+)
+def test_search_entities_of_type(make_builder, index_config):
+    builder = make_builder(index_config=index_config)
+    names = ["Apple", "Tesla", "Applied Materials"]
+    others = ["Apple Orchard"] + [f"apple thing {i}" for i in range(40)]
+    add_entities(builder, names + others, ["Company"] * 3 + [None] * len(others))
+    results = builder.search_entities("apple inc", entity_type="Company")
+    assert sorted(e.name for e, _ in results) == sorted(names)
+    assert results[0][0].name == "Apple"
+    assert builder.search_entities("apple inc", entity_type="Regulation") == []
+
+
+def merge_entities(builder, names, type_names=None):
+    type_names = type_names or [None] * len(names)
+    vectors = np.array(builder.embeddings.embed_documents(names), dtype=np.float32)
+    return builder.merge_entities(names, type_names, vectors)
+
+
+def make_triples(entities, *triples):
+    """(subject, object, timestamp) by name, all with the "rel" predicate"""
+    return [KGTriple(entities[s], "rel", entities[o], "url", t) for s, o, t in triples]
+
+
+@pytest.fixture
+def timed_builder(make_builder):
+    """Triples in buckets 0, 1 and 2 of 100 seconds, Apple only in bucket 0"""
+    builder = make_builder(time_bucket_seconds=100)
+    names = ["Apple", "Tesla", "Samsung", "Nvidia"]
+    entities = merge_entities(builder, names, ["Company"] * len(names))
+    builder.add_triples(
+        make_triples(
+            entities,
+            ("Apple", "Tesla", 50.0),
+            ("Tesla", "Samsung", 150.0),
+            ("Samsung", "Nvidia", 250.0),
+        )
+    )
+    return builder
+
+
+def names_of(triples):
+    return [(t.subject.name, t.object_.name) for t in triples]
+
+
+def test_compact_expires_whole_buckets(timed_builder):
+    timed_builder.compact(max_age=100, now=260)  # bucket 0 is before 160
+    expected = [("Tesla", "Samsung"), ("Samsung", "Nvidia")]
+    assert names_of(timed_builder.triples) == expected  # 150 is in bucket 1
+    timed_builder.compact(max_age=100, now=299)
+    assert names_of(timed_builder.triples) == expected
+
+
+def test_compact_removes_orphans(timed_builder):
+    timed_builder.compact(max_age=100, now=260)
+    remaining = ["Tesla", "Samsung", "Nvidia"]
+    assert sorted(timed_builder.doc_to_entity) == sorted(remaining)
+    assert {e.name for e in timed_builder.entities_of_type("Company")} == set(remaining)
+    assert "Apple" not in timed_builder.entity_typer.cache
+    assert timed_builder.lexical_index.exact("apple") is None
+    assert timed_builder.lexical_index.exact("tesla") == "Tesla"
+    names, vectors = timed_builder.get_entity_vectors()
+    assert sorted(names) == sorted(remaining)
+    assert sorted(timed_builder.entity_index_ids) == sorted(remaining)
+    assert timed_builder.vectorstore.index.ntotal == len(remaining) + 1  # root
+    expected = np.array(timed_builder.embeddings.embed_documents(names))
+    np.testing.assert_allclose(vectors, expected, atol=1e-6)
+    results = timed_builder.search_entities("apple", entity_type="Company")
+    assert "Apple" not in [e.name for e, _ in results]
+
+
+def test_triples_in_window(timed_builder):
+    window = timed_builder.triples_in_window(120, now=270)  # since 150
+    assert names_of(window) == [("Tesla", "Samsung"), ("Samsung", "Nvidia")]
+    window = timed_builder.triples_in_window(100, now=270)
+    assert names_of(window) == [("Samsung", "Nvidia")]
+    graph = timed_builder.get_graph(window=time.time() - 200)  # since 200
+    assert sorted(e.name for e in graph.nodes) == ["Nvidia", "Samsung"]
+    assert len(timed_builder.triples_in_window(1, now=1000)) == 0
+
+
+def test_add_triples_compacts_once_all_parts_are_added(make_builder):
+    now = time.time()
+    builder = make_builder(max_age=1000, time_bucket_seconds=100)
+    entities = merge_entities(builder, ["Apple", "Tesla", "Samsung"])
+    old = make_triples(entities, ("Apple", "Tesla", now - 5000))
+    new = make_triples(entities, ("Tesla", "Samsung", now))
+    builder.add_triples(old, auto_compact=False)
+    assert len(builder.doc_to_entity) == 3  # Samsung is only in the next part
+    builder.add_triples(new, auto_compact=False)
+    builder.compact(builder.max_age)
+    assert sorted(builder.doc_to_entity) == ["Samsung", "Tesla"]
+    assert names_of(builder.triples) == [("Tesla", "Samsung")]
+
+    builder.add_triples(make_triples(entities, ("Tesla", "Apple", now - 5000)))
+    assert names_of(builder.triples) == [("Tesla", "Samsung")]
+
+
+def test_parallel_workers_report_metrics(make_builder):
+    from langchain.llms.fake import FakeListLLM
+
+    response = "(Apple, makes, iPhone)<|>(Tesla, makes, cars)"
+    llm = FakeListLLM(responses=[response] * 4)  # each worker gets a copy
+    builder = make_builder(llm=llm)
+    contents = [base.Content(f"text {i}", f"url {i}", 1.0) for i in range(4)]
+    before = metrics.REGISTRY.to_dict()
+    builder.add_content_parallel(contents, n_workers=2)
+    after = metrics.REGISTRY.to_dict()
+    assert len(builder.triples) == 8
+
+    def added(kind, name, field=None):
+        def value(data):
+            metric = data[kind].get(name)
+            if metric is None:
+                return 0
+            return metric if field is None else metric[field]
+
+        return value(after) - value(before)
+
+    assert added("counters", "triples_total") == 8  # counted in the workers
+    assert added("histograms", "embed_seconds", "count") == len(contents)
+
+
 if __name__ == "__main__":
     builder = LLMGraphBuilder()
     builder.add_content(test_doc1)
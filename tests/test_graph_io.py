@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from know_net import graph_building, graph_io, turtle
+
+
+def merge_triples(builder, triples, type_names=None):
+    """Adds (subject, predicate, object, url, timestamp) tuples by name"""
+    names = list(dict.fromkeys(n for s, _, o, _, _ in triples for n in (s, o)))
+    type_names = type_names or {}
+    vectors = np.array(builder.embeddings.embed_documents(names), dtype=np.float32)
+    shard = graph_building.BuilderShard(
+        names, [type_names.get(n) for n in names], vectors, triples
+    )
+    builder.merge_shard(shard)
+
+
+def test_rdf_terms_are_one_to_one(make_builder, tmp_path):
+    builder = make_builder()
+    merge_triples(
+        builder, [("A B", "x y", "A_B", "u", 0.0), ("A_B", "x_y", "A%20B", "u", 0.0)]
+    )
+    assert len(builder.doc_to_entity) == 3
+    path = str(tmp_path / "graph.nt")
+    graph_io.write_ntriples(builder, path)
+    statements = turtle.parse(open(path).read())[1]
+    labels = [s for s in statements if s.predicate == graph_io.ontology.RDFS_LABEL]
+    assert len({s.subject for s in labels}) == 3
+    edges = [
+        s for s in statements if s.predicate.startswith(f"<{graph_io.RELATION_NS}")
+    ]
+    assert len({s.predicate for s in edges}) == 2
+    assert all(s.subject != s.object_ for s in edges)
+
+
+TRIPLES = [
+    ("Apple", "makes", "iPhone 15", "http://a.com/1", 100.0),
+    ("Apple", "competes with", "Samsung", "http://a.com/1", 100.0),
+    ("Samsung", "competes with", "Apple", "http://b.com/2", 200.0),
+    ("Apple", "makes", "iPhone 15", "http://b.com/2", 200.0),
+    ('Dr. "Quoted" Name', "lives in", "Zürich", "http://c.com/3", 300.0),
+    ("Zürich", "hosts", "Nvidia", "http://c.com/3", 300.5),
+]
+TYPES = {"Apple": "Company", "Samsung": "Company", "Nvidia": "Company"}
+
+
+@pytest.fixture
+def builder(make_builder):
+    builder = make_builder()
+    merge_triples(builder, TRIPLES, TYPES)
+    return builder
+
+
+def as_tuples(builder):
+    return [
+        (t.subject.name, t.predicate, t.object_.name, t.url, t.timestamp)
+        for t in builder.triples
+    ]
+
+
+@pytest.mark.parametrize("fmt", graph_io.COLUMNAR_FORMATS)
+def test_columnar_round_trip(builder, make_builder, tmp_path, monkeypatch, fmt):
+    if fmt != "npz":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(graph_io, "CHUNK_SIZE", 4)  # several chunks
+    graph_io.write_columnar(builder, str(tmp_path / "export"), fmt)
+    imported = graph_io.read_columnar(make_builder(), str(tmp_path / "export"))
+    assert as_tuples(imported) == as_tuples(builder) == TRIPLES
+    types = {
+        n: graph_building.get_type_name(e) for n, e in imported.doc_to_entity.items()
+    }
+    assert types == {n: TYPES.get(n) for n in builder.doc_to_entity}
+    assert {e.name for e in imported.entities_of_type("Company")} == set(TYPES)
+    names, vectors = builder.get_entity_vectors()
+    imported_names, imported_vectors = imported.get_entity_vectors()
+    assert imported_names == names
+    np.testing.assert_allclose(imported_vectors, vectors, atol=1e-6)
+
+
+def test_rdf_round_trip(builder, tmp_path):
+    graph_io.write_ntriples(builder, str(tmp_path / "graph.nt"))
+    graph_io.write_turtle(builder, str(tmp_path / "graph.ttl"))
+    ntriples = turtle.parse((tmp_path / "graph.nt").read_text())[1]
+    prefixes, statements = turtle.parse((tmp_path / "graph.ttl").read_text())
+    assert prefixes == graph_io.PREFIXES
+    assert statements == ntriples
+
+    terms = {n: graph_io.entity_term(n) for n in builder.doc_to_entity}
+    labels = {
+        s.subject: s.object_
+        for s in statements
+        if s.predicate == graph_io.ontology.RDFS_LABEL
+    }
+    assert labels == {t: f'"{turtle.escape_literal(n)}"' for n, t in terms.items()}
+    types = {s.subject: s.object_ for s in statements if s.predicate == turtle.RDF_TYPE}
+    assert types == {
+        terms[n]: turtle.iri_term(graph_io.ONT_NS + t) for n, t in TYPES.items()
+    }
+    edges = [
+        s for s in statements if s.predicate.startswith("<" + graph_io.RELATION_NS)
+    ]
+    assert edges == [
+        (terms[s], graph_io.relation_term(p), terms[o]) for s, p, o, _, _ in TRIPLES
+    ]
+
+
+def test_graphml_round_trip(builder, tmp_path):
+    path = str(tmp_path / "graph.graphml")
+    graph_io.write_graphml(builder, path)
+    graph = graph_io.read_graphml(path)
+    assert set(graph.nodes) == set(builder.doc_to_entity)
+    assert graph.nodes["Apple"]["type"] == "Company"
+    assert graph.nodes["Zürich"]["type"] == ""
+    assert graph.nodes["Apple"]["sources"] == ["http://a.com/1", "http://b.com/2"]
+    edge = graph.edges["Apple", "iPhone 15", "makes"]
+    assert edge["label"] == "makes"
+    assert edge["support"] == 2
+    assert edge["sources"] == ["http://a.com/1", "http://b.com/2"]
+    assert graph.number_of_edges() == len(TRIPLES) - 1  # one repeated triple
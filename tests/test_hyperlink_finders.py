@@ -0,0 +1,19 @@
+from know_net.content_retrievers import hyperlink_finders
+
+BASE_URL = "https://news.site.com/"
+
+
+def test_malformed_hrefs_are_skipped():
+    html = (
+        '<a href="http://[x">Broken link to a story</a>'
+        '<a href="//[::1">Another broken link here</a>'
+        '<a href="/apple-unveils-iphone-15.html#top">Apple unveils the iPhone 15</a>'
+    )
+    features = hyperlink_finders.extract_link_features(html, BASE_URL)
+    assert features.urls == [BASE_URL + "apple-unveils-iphone-15.html"]
+    assert features.slug_words.tolist() == [3]
+
+
+def test_only_http_links_are_kept():
+    html = '<a href="mailto:x@y.com">mail us</a><a href="ftp://x.com/f">file</a>'
+    assert not len(hyperlink_finders.extract_link_features(html, BASE_URL))
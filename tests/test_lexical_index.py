@@ -0,0 +1,33 @@
+from know_net import lexical_index
+
+
+def test_exact_keeps_distinguishing_symbols():
+    index = lexical_index.LexicalIndex(["C", "AT&T", "Apple, Inc."])
+    assert index.exact("c") == "C"
+    assert index.exact("C++") is None
+    assert index.exact("C#") is None
+    assert index.exact("at&t") == "AT&T"
+    assert index.exact("  apple inc. ") == "Apple, Inc."
+    assert index.exact("Apple Inc") is None
+
+
+def test_empty_keys_are_never_exact():
+    index = lexical_index.LexicalIndex(["!!!", "C"])
+    assert index.exact("???") is None
+    assert index.exact("!!!") is None
+    assert index.exact("") is None
+    assert len(index) == 2
+
+
+def test_aliases_and_retain():
+    index = lexical_index.LexicalIndex(["C++"])
+    index.add("cpp", "C++")
+    assert index.exact("CPP") == "C++"
+    assert index.retain(set()).exact("cpp") is None
+
+
+def test_search_ranks_near_names():
+    index = lexical_index.LexicalIndex(["iPhone 12", "Galaxy S21", "S.E.C."])
+    assert index.search("iphone12", k=1)[0][0] == "iPhone 12"
+    assert index.search("SEC", k=1) == [("S.E.C.", 1.0)]
+    assert index.search("iphone", entity_names={"Galaxy S21"}) == []
@@ -0,0 +1,31 @@
+from know_net import metrics
+
+
+def make_registry() -> metrics.Registry:
+    registry = metrics.Registry()
+    registry.inc("triples_total", 3)
+    for value in (0.002, 0.2, 100.0):  # the last one is only in +Inf
+        registry.observe("embed_seconds", value)
+    return registry
+
+
+def test_merge_adds_counters_and_histograms():
+    registry = make_registry()
+    registry.merge(make_registry().to_dict())
+    registry.merge(metrics.Registry().to_dict())
+    data = registry.to_dict()
+    assert data["counters"] == {"triples_total": 6}
+    histogram = data["histograms"]["embed_seconds"]
+    assert histogram["count"] == 6
+    assert histogram["sum"] == 2 * (0.002 + 0.2 + 100.0)
+    assert histogram["buckets"]["0.005"] == 2
+    assert histogram["buckets"]["60.0"] == 4
+    assert 'know_net_embed_seconds_bucket{le="+Inf"} 6' in registry.to_prometheus()
+
+
+def test_merge_into_empty_registry_and_clear():
+    registry = metrics.Registry()
+    registry.merge(make_registry().to_dict())
+    assert registry.to_dict() == make_registry().to_dict()
+    registry.clear()
+    assert registry.to_dict() == {"counters": {}, "histograms": {}}
@@ -0,0 +1,101 @@
+import pytest
+
+from know_net import make_merged_owl, turtle
+from know_net.ontology import ONT
+
+EX = "http://example.org/"
+PREFIXES = {"": EX, "owl": "http://www.w3.org/2002/07/owl#"}
+HEADER = f"@prefix : <{EX}> .\n@prefix owl: <http://www.w3.org/2002/07/owl#> .\n"
+
+
+def parse(text: str, **kwargs):
+    return turtle.parse(HEADER + text, **kwargs)[1]
+
+
+def test_predicate_object_lists():
+    statements = parse(":s :p :a , :b ; a :C .")
+    assert statements == [
+        turtle.Statement(f"<{EX}s>", f"<{EX}p>", f"<{EX}a>"),
+        turtle.Statement(f"<{EX}s>", f"<{EX}p>", f"<{EX}b>"),
+        turtle.Statement(f"<{EX}s>", turtle.RDF_TYPE, f"<{EX}C>"),
+    ]
+
+
+def test_literals():
+    statements = parse(
+        ':s :p "a \\"b\\"" , "x"@EN , 12 , 1.5 , 1e3 , true , """multi\nline""" .'
+    )
+    assert [o for _, _, o in statements] == [
+        '"a \\"b\\""',
+        '"x"@en',
+        f'"12"^^<{turtle.XSD}integer>',
+        f'"1.5"^^<{turtle.XSD}decimal>',
+        f'"1e3"^^<{turtle.XSD}double>',
+        f'"true"^^<{turtle.XSD}boolean>',
+        '"multi\\nline"',
+    ]
+
+
+def test_collection():
+    statements = parse(":s :p ( :a :b ) .")
+    by_subject = {(s, p): o for s, p, o in statements}
+    head = by_subject[f"<{EX}s>", f"<{EX}p>"]
+    assert by_subject[head, turtle.RDF_FIRST] == f"<{EX}a>"
+    second = by_subject[head, turtle.RDF_REST]
+    assert by_subject[second, turtle.RDF_FIRST] == f"<{EX}b>"
+    assert by_subject[second, turtle.RDF_REST] == turtle.RDF_NIL
+
+
+def test_explicit_and_generated_bnodes_are_distinct():
+    statements = parse("_:anon1 a :X . _:genid1 a :Z . :s :p [ a :Y ] .")
+    subjects = {s for s, _, _ in statements if s.startswith("_:")}
+    assert len(subjects) == 3
+
+
+def test_bnode_prefix():
+    statements = parse("_:x a :X . :s :p [] .", bnode_prefix="f0_")
+    assert all(s.startswith("_:f0_") for s, _, _ in statements[:1])
+    assert statements[1].object_.startswith("_:f0_")
+
+
+def test_syntax_error():
+    with pytest.raises(turtle.TurtleSyntaxError):
+        parse(":s :p .")
+    with pytest.raises(turtle.TurtleSyntaxError):
+        parse("undeclared:s :p :o .")
+
+
+def test_round_trip():
+    prefixes, statements = turtle.parse(ONT)
+    text = turtle.prefix_block(prefixes) + turtle.to_turtle(statements, prefixes)
+    assert turtle.parse(text)[1] == statements
+    ntriples = "".join(map(turtle.to_ntriples, statements))
+    assert turtle.parse(ntriples)[1] == statements
+
+
+def test_canonical_bnodes_match_across_documents():
+    restriction = ":A :sub [ a owl:Restriction ; :on :p ; :some ( :B :C ) ] ."
+    first = turtle.canonicalize_bnodes(parse(restriction, bnode_prefix="f0_"))
+    second = turtle.canonicalize_bnodes(parse(restriction, bnode_prefix="f1_"))
+    assert set(first) == set(second)
+    other = ":Z :sub [ a owl:Restriction ; :on :p ; :some ( :B :C ) ] ."
+    assert not set(first) & set(turtle.canonicalize_bnodes(parse(other)))
+
+
+def test_shared_bnodes_keep_their_label():
+    statements = parse(":a :p _:x . :b :p _:x . :c :p _:y . :d :p _:z .")
+    canonical = turtle.canonicalize_bnodes(statements)
+    assert canonical[:2] == statements[:2]
+    assert canonical[2].object_ != canonical[3].object_  # different parents
+
+
+def test_merge_deduplicates_restrictions(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    fragment = ":A :sub [ a owl:Restriction ; :on :p ; :some :B ] .\n"
+    for i in range(2):
+        (data / f"turtle_{i}.ttl").write_text(HEADER + fragment)
+    output = tmp_path / "ontology.owl"
+    make_merged_owl.main(str(data), str(output), None)
+    statements = turtle.parse(output.read_text())[1]
+    assert len([s for s in statements if s.predicate == f"<{EX}sub>"]) == 1
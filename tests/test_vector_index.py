@@ -0,0 +1,115 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from know_net import vector_index
+
+DIM = 16
+
+IVF_CONFIG = vector_index.IndexConfig(
+    index_type="ivf", ivf_train_size=64, ivf_nlist=4, ivf_nprobe=4
+)
+CONFIGS = [
+    vector_index.IndexConfig(),
+    vector_index.IndexConfig(n_shards=3),
+    vector_index.IndexConfig(metric="l2", n_shards=2),
+    IVF_CONFIG,
+    IVF_CONFIG._replace(n_shards=2),
+    vector_index.IndexConfig(index_type="hnsw", n_shards=2),
+]
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def normalized(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_vectors_find_themselves(config):
+    index = vector_index.VectorIndex(DIM, config)
+    x = random_vectors(100)
+    index.add(x[:60])
+    index.add(x[60:])
+    assert index.ntotal == 100
+    _, ids = index.search(x, 1)
+    assert ids[:, 0].tolist() == list(range(100))
+
+
+def test_ivf_trains_once_the_buffer_is_full():
+    index = vector_index.VectorIndex(DIM, IVF_CONFIG)
+    x = random_vectors(100)
+    index.add(x[:40])
+    assert not index.is_trained and index.buffer is not None
+    assert index.search(x[:40], 1)[1][:, 0].tolist() == list(range(40))
+    index.add(x[40:70])
+    assert index.is_trained and index.buffer is None
+    assert sum(shard.ntotal for shard in index.shards) == 70
+    index.add(x[70:])
+    assert sum(shard.ntotal for shard in index.shards) == index.ntotal == 100
+
+
+@pytest.mark.parametrize("config", [CONFIGS[1], IVF_CONFIG._replace(n_shards=2)])
+def test_round_robin_ids_and_reconstruct(config):
+    index = vector_index.VectorIndex(DIM, config)
+    x = random_vectors(100)
+    for start in range(0, 100, 7):  # uneven batches
+        index.add(x[start : start + 7])
+    n_shards = config.n_shards
+    assert [s.ntotal for s in index.shards] == [
+        len(range(i, 100, n_shards)) for i in range(n_shards)
+    ]
+    for i in range(100):
+        np.testing.assert_allclose(index.reconstruct(i), normalized(x)[i], atol=1e-6)
+
+
+def test_cosine_scores_are_similarities():
+    index = vector_index.VectorIndex(DIM)
+    x = random_vectors(10)
+    index.add(x * 10)
+    scores, ids = index.search(x[:1] * 0.1, 10)
+    expected = normalized(x)[ids[0]] @ normalized(x)[0]
+    np.testing.assert_allclose(scores[0], expected, atol=1e-5)
+    assert scores[0, 0] == pytest.approx(1.0)
+    assert vector_index.cosine_relevance_score(scores[0, 0]) == scores[0, 0]
+
+
+def test_l2_keeps_vectors_unnormalized():
+    index = vector_index.VectorIndex(DIM, vector_index.IndexConfig(metric="l2"))
+    x = random_vectors(10)
+    index.add(x * 10)
+    np.testing.assert_allclose(index.reconstruct(3), x[3] * 10, rtol=1e-6)
+    distances, ids = index.search(x[3:4] * 10, 1)
+    assert ids[0, 0] == 3 and distances[0, 0] == pytest.approx(0.0, abs=1e-3)
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_search_restricted_to_ids(config):
+    index = vector_index.VectorIndex(DIM, config)
+    x = random_vectors(100)
+    index.add(x)
+    for ids in [list(range(0, 100, 2)), [3, 5, 7]]:
+        _, found = index.search(x, 3, ids=ids)
+        assert set(found.ravel()) <= set(ids) | {-1}
+        assert [found[i, 0] for i in ids] == ids
+    _, found = index.search(x[:1], 4, ids=[3, 5, 7])
+    assert sorted(found[0].tolist()) == [-1, 3, 5, 7]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_pickle(config):
+    index = vector_index.VectorIndex(DIM, config)
+    x = random_vectors(100)
+    index.add(x)
+    expected = index.search(x, 5)  # also builds the shard searcher
+    restored = pickle.loads(pickle.dumps(index))
+    assert restored.ntotal == 100
+    for actual, wanted in zip(restored.search(x, 5), expected):
+        np.testing.assert_array_equal(actual, wanted)
+    restored.add(random_vectors(10, seed=1))
+    assert restored.search(random_vectors(10, seed=1), 1)[1][:, 0].tolist() == list(
+        range(100, 110)
+    )